@@ -0,0 +1,210 @@
+from __future__ import annotations
+import numpy as np
+import dataclasses
+import typing
+import pathlib
+import itertools
+import concurrent.futures
+import argparse
+import json
+import csv
+import time
+
+from cy_levenshtein import (
+    cy_levenshtein_dist,
+    cy_levenshtein_dist_dp,
+    cy_levenshtein_dist_myers,
+    cy_levenshtein_dist_pairwise,
+    cy_levenshtein_dist_batch,
+)
+from main import Corpus, Vocab, smallest_uint_dtype
+
+KERNELS = ('python', 'cy_levenshtein_dist', 'dp', 'myers', 'pairwise', 'batch')
+THREADED_KERNELS = ('batch',)
+MAX_PYTHON_PAIRS = 2000 # the pure-python baseline is only timed on a sample of pairs
+
+@dataclasses.dataclass(frozen=True)
+class BenchCase:
+    kernel: str
+    num_docs: int
+    doc_len: int
+    vocab_size: int
+    num_threads: int = 1
+
+    def key(self) -> str:
+        return f'{self.kernel}/docs={self.num_docs}/len={self.doc_len}/vocab={self.vocab_size}/threads={self.num_threads}'
+
+@dataclasses.dataclass
+class BenchResult:
+    case: BenchCase
+    seconds: float
+    num_pairs: int
+
+    @property
+    def pairs_per_sec(self) -> float:
+        return self.num_pairs / self.seconds
+
+    def asdict(self) -> typing.Dict[str, typing.Any]:
+        return {**dataclasses.asdict(self.case), 'key': self.case.key(), 'seconds': self.seconds,
+            'num_pairs': self.num_pairs, 'pairs_per_sec': self.pairs_per_sec}
+
+######################## Corpus Generation ########################
+def make_corpus(num_docs: int, doc_len: int, vocab_size: int, seed: int = 0) -> Corpus:
+    '''Random corpus of equal-length documents with uniformly drawn tokens.'''
+    rng = np.random.default_rng(seed)
+    num_toks = num_docs * doc_len
+    new_corpus = Corpus(
+        token_ids = rng.integers(0, vocab_size, num_toks).astype(smallest_uint_dtype(vocab_size-1)),
+        doc_indices = np.arange(0, num_toks+1, doc_len, dtype=smallest_uint_dtype(num_toks)),
+        vocab = Vocab.from_toks([str(i) for i in range(vocab_size)]),
+    )
+    return new_corpus
+
+def levenshtein_py(a: typing.Sequence[int], b: typing.Sequence[int]) -> int:
+    '''Pure-python baseline and reference implementation.'''
+    prev = list(range(len(b)+1))
+    for i, x in enumerate(a, 1):
+        cur = [i]
+        for j, y in enumerate(b, 1):
+            cur.append(min(prev[j] + 1, cur[j-1] + 1, prev[j-1] + (x != y)))
+        prev = cur
+    return prev[-1]
+
+######################## Running ########################
+def run_case(case: BenchCase, repeats: int = 3) -> typing.Optional[BenchResult]:
+    '''Best-of-repeats timing for one case, or None if the kernel does not
+        apply (e.g. bit-parallel kernel on documents longer than 64 tokens).
+    '''
+    if case.kernel == 'myers' and case.doc_len > 64:
+        return None
+
+    corpus = make_corpus(case.num_docs, case.doc_len, case.vocab_size)
+    pairs = list(itertools.combinations(range(corpus.num_docs()), 2))
+    if case.kernel == 'python':
+        pairs = pairs[:MAX_PYTHON_PAIRS]
+
+    # threads are only started if the kernel submits work
+    with concurrent.futures.ThreadPoolExecutor(max_workers=case.num_threads) as executor:
+        fn = _kernel_fn(case, corpus, pairs, executor)
+        best = float('inf')
+        for _ in range(repeats):
+            start = time.perf_counter()
+            fn()
+            best = min(best, time.perf_counter() - start)
+
+    return BenchResult(case=case, seconds=best, num_pairs=len(pairs))
+
+def _kernel_fn(
+        case: BenchCase, 
+        corpus: Corpus, 
+        pairs: typing.List[typing.Tuple[int,int]], 
+        executor: concurrent.futures.Executor,
+    ) -> typing.Callable[[], typing.Any]:
+    docs = [corpus.doc_token_ids(i) for i in range(corpus.num_docs())]
+    scratch = np.empty((case.doc_len+1,), dtype=np.uint64)
+
+    if case.kernel == 'python':
+        py_docs = [d.tolist() for d in docs]
+        return lambda: [levenshtein_py(py_docs[i], py_docs[j]) for i, j in pairs]
+    elif case.kernel == 'cy_levenshtein_dist':
+        return lambda: [cy_levenshtein_dist(docs[i], docs[j], scratch) for i, j in pairs]
+    elif case.kernel == 'dp':
+        return lambda: [cy_levenshtein_dist_dp(docs[i], docs[j], scratch) for i, j in pairs]
+    elif case.kernel == 'myers':
+        return lambda: [cy_levenshtein_dist_myers(docs[i], docs[j]) for i, j in pairs]
+    elif case.kernel == 'pairwise':
+        out = np.empty((len(pairs),), dtype=np.uint64)
+        return lambda: cy_levenshtein_dist_pairwise(corpus.doc_indices, corpus.token_ids, out)
+    elif case.kernel == 'batch':
+        return _batch_fn(case, corpus, pairs, executor)
+    else:
+        raise ValueError(f'Unknown kernel {case.kernel=}. Choose from {KERNELS}.')
+
+def _batch_fn(
+        case: BenchCase, 
+        corpus: Corpus, 
+        pairs: typing.List[typing.Tuple[int,int]], 
+        executor: concurrent.futures.Executor,
+    ) -> typing.Callable[[], typing.Any]:
+    '''Batch kernel over all pairs, split into one chunk per thread. The
+        kernel computes inside a nogil block, so chunks run in parallel.
+    '''
+    pair_arr = np.array(pairs, dtype=np.int64).reshape(-1, 2)
+    chunks = []
+    for chunk in np.array_split(pair_arr, case.num_threads):
+        ds1 = np.concatenate([corpus.doc_token_ids(i) for i in chunk[:,0]] or [corpus.token_ids[:0]])
+        ds2 = np.concatenate([corpus.doc_token_ids(j) for j in chunk[:,1]] or [corpus.token_ids[:0]])
+        inds = np.arange(0, (len(chunk)+1)*case.doc_len, case.doc_len, dtype=np.uint64)
+        scratch = np.empty((case.doc_len+1,), dtype=np.uint64)
+        out = np.empty((len(chunk),), dtype=np.uint64)
+        chunks.append((ds1, inds, ds2, inds, scratch, out))
+
+    return lambda: list(executor.map(lambda args: cy_levenshtein_dist_batch(*args), chunks))
+
+def make_cases(
+        kernels: typing.Iterable[str] = KERNELS,
+        num_docs: typing.Iterable[int] = (100, 400),
+        doc_lens: typing.Iterable[int] = (8, 32, 128),
+        vocab_sizes: typing.Iterable[int] = (50, 5000),
+        thread_counts: typing.Iterable[int] = (1, 2, 4),
+    ) -> typing.List[BenchCase]:
+    '''Grid of cases. Thread counts only vary for kernels that use threads.'''
+    cases = list()
+    for kernel, n, l, v in itertools.product(kernels, num_docs, doc_lens, vocab_sizes):
+        for t in (thread_counts if kernel in THREADED_KERNELS else (1,)):
+            cases.append(BenchCase(kernel, n, l, v, t))
+    return cases
+
+######################## Output and Regression Check ########################
+def write_json(results: typing.List[BenchResult], fpath: str|pathlib.Path) -> None:
+    with pathlib.Path(fpath).open('w') as f:
+        json.dump([r.asdict() for r in results], f, indent=2)
+
+def write_csv(results: typing.List[BenchResult], fpath: str|pathlib.Path) -> None:
+    rows = [r.asdict() for r in results]
+    with pathlib.Path(fpath).open('w', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=list(rows[0].keys()) if rows else ['key'])
+        writer.writeheader()
+        writer.writerows(rows)
+
+def check_regression(results: typing.List[BenchResult], baseline_fpath: str|pathlib.Path, tolerance: float = 0.1) -> typing.List[str]:
+    '''Compare throughput to a previous JSON run. Returns a message for each
+        case that is more than tolerance slower than the baseline.
+    '''
+    with pathlib.Path(baseline_fpath).open('r') as f:
+        baseline = {r['key']: r['pairs_per_sec'] for r in json.load(f)}
+
+    regressions = list()
+    for r in results:
+        old = baseline.get(r.case.key())
+        if old is not None and r.pairs_per_sec < old * (1 - tolerance):
+            regressions.append(f'{r.case.key()}: {r.pairs_per_sec:,.0f} pairs/s vs baseline {old:,.0f} pairs/s.')
+    return regressions
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark Levenshtein kernels.')
+    parser.add_argument('--kernels', nargs='+', default=list(KERNELS), choices=KERNELS)
+    parser.add_argument('--threads', nargs='+', type=int, default=[1, 2, 4])
+    parser.add_argument('--repeats', type=int, default=3)
+    parser.add_argument('--json', default='bench_results.json')
+    parser.add_argument('--csv', default='bench_results.csv')
+    parser.add_argument('--baseline', default=None, help='previous JSON results to check for regressions')
+    parser.add_argument('--tolerance', type=float, default=0.1)
+    args = parser.parse_args()
+
+    results = list()
+    for case in make_cases(kernels=args.kernels, thread_counts=args.threads):
+        result = run_case(case, repeats=args.repeats)
+        if result is not None:
+            print(f'{case.key()}: {result.pairs_per_sec:,.0f} pairs/s')
+            results.append(result)
+
+    write_json(results, args.json)
+    write_csv(results, args.csv)
+
+    if args.baseline is not None:
+        regressions = check_regression(results, args.baseline, args.tolerance)
+        for msg in regressions:
+            print(f'REGRESSION {msg}')
+        if len(regressions) > 0:
+            exit(1)
@@ -1,104 +1,330 @@
 #from cpython cimport array
 #import array
+cimport cython
 from libc.stdlib cimport malloc, free
-from libc.stdint cimport uint64_t
+from libc.string cimport memset
+from libc.stdint cimport uint8_t, uint16_t, uint32_t, uint64_t
+
+# token ids and document offsets are stored in the smallest unsigned type
+# that fits (see Corpus in main.py), so kernels are generic over all of them.
+# bytes are read as uint8_t and str as UCS-4 code points (uint32_t).
+ctypedef fused token_t:
+    uint8_t
+    uint16_t
+    uint32_t
+    uint64_t
+
+ctypedef fused index_t:
+    uint8_t
+    uint16_t
+    uint32_t
+    uint64_t
+
+cdef enum:
+    MYERS_MAX_LEN = 64 # bits in the machine word used by the bit-parallel kernel
+    PEQ_BITS = 7
+    PEQ_SIZE = 128 # open-addressing table for at most MYERS_MAX_LEN distinct symbols
 
 #cdef array.array int_array_template = array.array('u', []) # use to create new arrays with clone
 # cdef array.array newarray
 # create an array with 3 elements with same type as template
 #newarray = array.clone(int_array_template, 3, zero=False)
 
+######################## Python-Facing Kernels ########################
+
 cpdef uint64_t cy_levenshtein_dist_pairwise(
-        const uint64_t[:] doc_indices, # note that this has num docs + 1 entries
-        const uint64_t[:] ds, 
-        uint64_t[:] distances,
-    ) nogil:
-    '''Computes pairwise distances between all documents in the corpus.'''
-    cdef uint64_t i, j, dist
-    
-    cdef uint64_t ct = 0
+        const index_t[::1] doc_indices, # note that this has num docs + 1 entries
+        const token_t[::1] ds,
+        uint64_t[::1] distances, # has num_docs*(num_docs-1)/2 entries
+    ) except? 0 nogil:
+    '''Computes pairwise distances between all documents in the corpus.
+        Distances are written in row-major upper-triangle order. Returns
+        the number of distances written.
+    '''
+    cdef uint64_t i, j, max_size = 0
+
     for i in range(len(doc_indices)-1):
-        for j in range(i+1, len(doc_indices)-1):
-            dist = cy_levenshtein_dist_single(ds, doc_indices[i], doc_indices[i+1]-doc_indices[i], doc_indices[j], doc_indices[j+1]-doc_indices[j])
-            print(f'{corpus.doc_tokens(i)} --> {corpus.doc_tokens(j)}, {dist=}')
+        if doc_indices[i+1]-doc_indices[i] > max_size:
+            max_size = doc_indices[i+1]-doc_indices[i]
+
+    cdef uint64_t *row = _alloc_row(max_size)
+    cdef uint64_t ct = 0
+    try:
+        for i in range(len(doc_indices)-1):
+            for j in range(i+1, len(doc_indices)-1):
+                distances[ct] = _span_dist(ds, doc_indices[i], doc_indices[i+1]-doc_indices[i], doc_indices[j], doc_indices[j+1]-doc_indices[j], row)
+                ct += 1
+    finally:
+        free(row)
+
+    return ct
+
+
+cpdef uint64_t cy_levenshtein_dist_tile(
+        const index_t[::1] doc_indices, # note that this has num docs + 1 entries
+        const token_t[::1] ds,
+        const uint64_t i_start,
+        const uint64_t i_stop,
+        const uint64_t j_start,
+        const uint64_t j_stop,
+        const uint64_t max_dist,
+        uint64_t[::1] out_i, # each out array needs one entry per pair in the tile
+        uint64_t[::1] out_j,
+        uint64_t[::1] out_dist,
+    ) except? 0 nogil:
+    '''Computes distances for document pairs i < j where i is in
+        [i_start, i_stop) and j is in [j_start, j_stop). Only pairs with
+        distance <= max_dist are written, as sparse (i, j, dist) records.
+        Returns the number of records written.
+    '''
+    cdef uint64_t i, j, dist, max_size = 0
+
+    for i in range(i_start, i_stop):
+        if doc_indices[i+1]-doc_indices[i] > max_size:
+            max_size = doc_indices[i+1]-doc_indices[i]
+    for j in range(j_start, j_stop):
+        if doc_indices[j+1]-doc_indices[j] > max_size:
+            max_size = doc_indices[j+1]-doc_indices[j]
+
+    cdef uint64_t *row = _alloc_row(max_size)
+    cdef uint64_t ct = 0
+    try:
+        for i in range(i_start, i_stop):
+            for j in range(j_start if j_start > i else i+1, j_stop):
+                dist = _span_dist(ds, doc_indices[i], doc_indices[i+1]-doc_indices[i], doc_indices[j], doc_indices[j+1]-doc_indices[j], row)
+                if dist <= max_dist:
+                    out_i[ct] = i
+                    out_j[ct] = j
+                    out_dist[ct] = dist
+                    ct += 1
+    finally:
+        free(row)
+
+    return ct
 
 
 cpdef uint64_t cy_levenshtein_dist_single(
-        const uint64_t[:] ds, 
+        const token_t[::1] ds,
         const uint64_t start1,
         const uint64_t size1,
         const uint64_t start2,
         const uint64_t size2,
-    ) nogil:
+    ) except? 0 nogil:
     '''For use in distance multi.'''
-    
-    #cdef array.array dist_array = array.clone(int_array_template, size1, zero=False)
-    #cdef uint64_t[:] distances = dist_array
-    cdef uint64_t *distances = <uint64_t *> malloc(size1 * sizeof(uint64_t))
-    cdef uint64_t i, j
-    cdef uint64_t dist, temp_dist
-
+    cdef uint64_t *row = _alloc_row(size1 if size1 < size2 else size2)
+    cdef uint64_t dist
     try:
-        distances[0] = 0
-
-        for i in range(1, size1+1):
-            distances[i] = calc_min_two(distances[i-1], i-1)
-
-            if ds[start1+i-1] != ds[start2]:
-                distances[i] += 1
-        
-        for j in range(1, size2):
-            dist = j + 1
-            for i in range(1, size1+1):
-                temp_dist = calc_min_three(dist, distances[i-1], distances[i])
-                if ds[start1+i-1] != ds[start2+j]:
-                    temp_dist += 1
-            
-                distances[i-1] = dist
-                dist = temp_dist
+        dist = _span_dist(ds, start1, size1, start2, size2, row)
     finally:
-        free(distances)
+        free(row)
 
     return dist
 
 
+@cython.boundscheck(False)
+@cython.wraparound(False)
+cpdef uint64_t cy_levenshtein_dist(const token_t[::1] d1, const token_t[::1] d2, uint64_t[::1] distances) nogil:
+    '''Distance between two sequences. distances is scratch space with at
+        least min(len(d1), len(d2))+1 entries.
+    '''
+    if d1.shape[0] == 0 or d2.shape[0] == 0:
+        return d1.shape[0] + d2.shape[0]
+    return _seq_dist(&d1[0], d1.shape[0], &d2[0], d2.shape[0], &distances[0])
 
 
-cpdef uint64_t cy_levenshtein_dist(const uint64_t[:] d1, const uint64_t[:] d2, uint64_t[:] distances) nogil:
-    
-    distances[0] = 0
+@cython.boundscheck(False)
+@cython.wraparound(False)
+cpdef uint64_t cy_levenshtein_dist_dp(const token_t[::1] d1, const token_t[::1] d2, uint64_t[::1] distances) nogil:
+    '''Same as cy_levenshtein_dist but always uses the dynamic program. For
+        benchmarking; distances needs len(d1)+1 entries.
+    '''
+    if d1.shape[0] == 0 or d2.shape[0] == 0:
+        return d1.shape[0] + d2.shape[0]
+    return _dp_dist(&d1[0], d1.shape[0], &d2[0], d2.shape[0], &distances[0])
 
-    cdef int i, j
-    for i in range(1, len(d1)+1):
-        distances[i] = calc_min_two(distances[i-1], i-1)
 
-        if d1[i-1] != d2[0]:
-            distances[i] += 1
+@cython.boundscheck(False)
+@cython.wraparound(False)
+cpdef uint64_t cy_levenshtein_dist_myers(const token_t[::1] d1, const token_t[::1] d2) except? 0 nogil:
+    '''Same as cy_levenshtein_dist but always uses the bit-parallel kernel.
+        For benchmarking; d1 must have at most 64 entries.
+    '''
+    if d1.shape[0] > MYERS_MAX_LEN:
+        with gil:
+            raise ValueError(f'Bit-parallel kernel needs len(d1) <= {MYERS_MAX_LEN}.')
+    if d1.shape[0] == 0 or d2.shape[0] == 0:
+        return d1.shape[0] + d2.shape[0]
+    return _myers_dist(&d1[0], d1.shape[0], &d2[0], d2.shape[0])
 
-    cdef uint64_t dist, temp_dist
-    for j in range(1, len(d2)):
-        dist = j + 1
-        for i in range(1, len(d1)+1):
-            temp_dist = calc_min_three(dist, distances[i-1], distances[i])
-            if d1[i-1] != d2[j]:
-                temp_dist += 1
-        
-            distances[i-1] = dist
-            dist = temp_dist
 
-    return dist
+@cython.boundscheck(False)
+@cython.wraparound(False)
+cpdef void cy_levenshtein_dist_batch(
+        const token_t[::1] ds1,
+        const index_t[::1] inds1, # num sequences + 1 entries
+        const token_t[::1] ds2,
+        const index_t[::1] inds2, # num sequences + 1 entries
+        uint64_t[::1] distances, # scratch space; at least the longest min(size1, size2)+1
+        uint64_t[::1] out, # num sequences entries
+    ) noexcept:
+    '''Elementwise distance between the k-th sequence of ds1 and the k-th
+        sequence of ds2, for flat buffers split by offset arrays. Releases
+        the GIL while computing, so calls from several threads run in
+        parallel.
+    '''
+    cdef Py_ssize_t k
+    cdef uint64_t size1, size2
+    with nogil:
+        for k in range(out.shape[0]):
+            size1 = inds1[k+1] - inds1[k]
+            size2 = inds2[k+1] - inds2[k]
+            if size1 == 0 or size2 == 0:
+                out[k] = size1 + size2
+            else:
+                out[k] = _seq_dist(&ds1[inds1[k]], size1, &ds2[inds2[k]], size2, &distances[0])
 
-cpdef uint64_t calc_min_two(const uint64_t a, const uint64_t b) nogil:
+
+cpdef uint64_t calc_min_two(const uint64_t a, const uint64_t b) noexcept nogil:
     if a <= b:
         return a
     else:
         return b
 
-cpdef uint64_t calc_min_three(const uint64_t a, const uint64_t b, const uint64_t c) nogil:
+cpdef uint64_t calc_min_three(const uint64_t a, const uint64_t b, const uint64_t c) noexcept nogil:
     cdef uint64_t the_min = calc_min_two(a, b)
-    
+
     if c < the_min:
         the_min = c
-    
+
     return the_min
 
+
+######################## Internal Kernels ########################
+
+cdef uint64_t *_alloc_row(uint64_t size) except NULL nogil:
+    '''Scratch row for the dynamic program over a sequence of this size.'''
+    cdef uint64_t *row = <uint64_t *> malloc((size+1) * sizeof(uint64_t))
+    if row == NULL:
+        with gil:
+            raise MemoryError()
+    return row
+
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+cdef inline uint64_t _span_dist(
+        const token_t[::1] ds,
+        uint64_t start1,
+        uint64_t size1,
+        uint64_t start2,
+        uint64_t size2,
+        uint64_t *row,
+    ) noexcept nogil:
+    '''Distance between two spans of the same flat token buffer.'''
+    if size1 == 0 or size2 == 0:
+        return size1 + size2
+    return _seq_dist(&ds[start1], size1, &ds[start2], size2, row)
+
+
+cdef uint64_t _seq_dist(
+        const token_t *a,
+        uint64_t size_a,
+        const token_t *b,
+        uint64_t size_b,
+        uint64_t *row,
+    ) noexcept nogil:
+    '''Routes non-empty sequences to the bit-parallel kernel when the shorter
+        one fits in a machine word, otherwise to the dynamic program.
+    '''
+    if size_a > size_b:
+        a, b = b, a
+        size_a, size_b = size_b, size_a
+
+    if size_a <= MYERS_MAX_LEN:
+        return _myers_dist(a, size_a, b, size_b)
+    else:
+        return _dp_dist(a, size_a, b, size_b, row)
+
+
+cdef uint64_t _dp_dist(
+        const token_t *a,
+        uint64_t size_a,
+        const token_t *b,
+        uint64_t size_b,
+        uint64_t *row,
+    ) noexcept nogil:
+    '''Single-row dynamic program. row must have size_a+1 entries.'''
+    cdef uint64_t i, j, diag, temp_dist
+
+    for i in range(size_a+1):
+        row[i] = i
+
+    for j in range(1, size_b+1):
+        diag = row[0]
+        row[0] = j
+        for i in range(1, size_a+1):
+            temp_dist = row[i]
+            row[i] = calc_min_three(row[i] + 1, row[i-1] + 1, diag + (a[i-1] != b[j-1]))
+            diag = temp_dist
+
+    return row[size_a]
+
+
+cdef uint64_t _myers_dist(
+        const token_t *a,
+        uint64_t size_a,
+        const token_t *b,
+        uint64_t size_b,
+    ) noexcept nogil:
+    '''Bit-parallel distance (Myers 1999, in Hyyrö's formulation). Requires
+        0 < size_a <= MYERS_MAX_LEN. Each bit of the vertical delta vectors
+        pv/mv tracks whether a cell in the current column is one more or
+        one less than the cell above it.
+    '''
+    cdef uint64_t keys[PEQ_SIZE]
+    cdef uint64_t masks[PEQ_SIZE]
+    cdef bint used[PEQ_SIZE]
+    cdef uint64_t i, j, h
+    cdef uint64_t pv, mv, ph, mh, xv, xh, eq, last, score
+
+    # match masks: bit i of masks[slot(c)] is set when a[i] == c
+    memset(used, 0, sizeof(used))
+    for i in range(size_a):
+        h = _peq_slot(keys, used, a[i])
+        if not used[h]:
+            used[h] = True
+            keys[h] = a[i]
+            masks[h] = 0
+        masks[h] |= (<uint64_t>1) << i
+
+    pv = ~(<uint64_t>0)
+    mv = 0
+    score = size_a
+    last = (<uint64_t>1) << (size_a - 1)
+    for j in range(size_b):
+        h = _peq_slot(keys, used, b[j])
+        eq = masks[h] if used[h] else 0
+
+        xv = eq | mv
+        xh = (((eq & pv) + pv) ^ pv) | eq
+        ph = mv | ~(xh | pv)
+        mh = pv & xh
+        if ph & last:
+            score += 1
+        elif mh & last:
+            score -= 1
+
+        ph = (ph << 1) | 1
+        mh = mh << 1
+        pv = mh | ~(xv | ph)
+        mv = ph & xv
+
+    return score
+
+
+cdef inline uint64_t _peq_slot(const uint64_t *keys, const bint *used, uint64_t key) noexcept nogil:
+    '''Linear-probe slot holding key, or the empty slot where it belongs.'''
+    cdef uint64_t h = (key * <uint64_t>11400714819323198485ULL) >> (64 - PEQ_BITS)
+    while used[h] and keys[h] != key:
+        h = (h + 1) & (PEQ_SIZE - 1)
+    return h
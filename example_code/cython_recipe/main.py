@@ -2,34 +2,96 @@ from __future__ import annotations
 import numpy as np
 import dataclasses
 import typing
+import pathlib
 
-from cy_levenshtein import cy_levenshtein_dist, cy_levenshtein_dist_generic
+from cy_levenshtein import cy_levenshtein_dist, cy_levenshtein_dist_batch
+
+UINT_DTYPES = (np.uint8, np.uint16, np.uint32, np.uint64)
+
+def smallest_uint_dtype(max_value: int) -> np.dtype:
+    '''Smallest unsigned dtype supported by the cython kernels that can hold max_value.'''
+    for dtype in UINT_DTYPES:
+        if max_value <= np.iinfo(dtype).max:
+            return np.dtype(dtype)
+    raise OverflowError(f'Value {max_value=} does not fit in any of {UINT_DTYPES}.')
 
 @dataclasses.dataclass
 class Vocab:
-    current_ind: int = 0
-    ind_to_tok: typing.Dict[int,str] = dataclasses.field(default_factory=dict)
+    '''Maps tokens to contiguous indices. The reverse mapping is a plain 
+        list (index is position) so decoding never hashes.
+    '''
+    ind_to_tok: typing.List[str] = dataclasses.field(default_factory=list)
     tok_to_ind: typing.Dict[str,int] = dataclasses.field(default_factory=dict)
+    _tok_array: typing.Optional[np.ndarray[np.object_]] = dataclasses.field(default=None, init=False, repr=False, compare=False)
+    
+    @classmethod
+    def from_toks(cls, toks: typing.List[str]):
+        '''Build from tokens already ordered by index.'''
+        new_vocab: cls = cls(
+            ind_to_tok = list(toks),
+            tok_to_ind = {tok:i for i,tok in enumerate(toks)},
+        )
+        return new_vocab
+    
+    @property
+    def current_ind(self) -> int:
+        '''Index that will be assigned to the next new token.'''
+        return len(self.ind_to_tok)
+    
+    def __len__(self) -> int:
+        return len(self.ind_to_tok)
     
     def add_tok(self, tok: str) -> int:
         '''Get index of current token (or add it) and return it.'''
-        if tok not in self.tok_to_ind:
-            self.tok_to_ind[tok] = self.current_ind
-            self.ind_to_tok[self.current_ind] = tok
-            self.current_ind += 1
-            
+        try:
+            return self.tok_to_ind[tok]
+        except KeyError:
+            ind = self.tok_to_ind[tok] = len(self.ind_to_tok)
+            self.ind_to_tok.append(tok)
+            self._tok_array = None
+            return ind
+    
+    def get_ind(self, tok: str) -> int:
         return self.tok_to_ind[tok]
     
-    def get_indices(self, toks: typing.Iterable[str]) -> np.ndarray[np.uint64]:
+    def get_indices(self, toks: typing.Iterable[str]) -> np.ndarray[np.uint16|np.uint32|np.uint64]:
         '''Plural of get index, but returns a numpy array.'''
-        return np.array([self.get_ind(t) for t in toks], dtype=np.uint64)
+        return np.array([self.get_ind(t) for t in toks], dtype=smallest_uint_dtype(max(len(self)-1, 0)))
+    
+    def decode(self, ids: np.ndarray) -> typing.List[str]:
+        '''Convert an array of token ids back to tokens with one vectorized take.'''
+        if self._tok_array is None:
+            self._tok_array = np.array(self.ind_to_tok, dtype=np.object_)
+        return self._tok_array.take(ids).tolist()
+    
+    ######################## Saving/Loading ########################
+    def save(self, fpath: str|pathlib.Path) -> None:
+        '''Save as a text file with one token per line, ordered by index.'''
+        toks = self.ind_to_tok
+        for tok in toks:
+            if '\n' in tok:
+                raise ValueError(f'Cannot save vocab token containing a newline: {tok=}.')
+        
+        with pathlib.Path(fpath).open('w', encoding='utf-8', newline='\n') as f:
+            f.write(''.join(f'{tok}\n' for tok in toks))
+    
+    @classmethod
+    def load(cls, fpath: str|pathlib.Path):
+        '''Load vocab from a file written by save(). Line number is token index.'''
+        with pathlib.Path(fpath).open('r', encoding='utf-8', newline='\n') as f:
+            toks = f.read().split('\n')[:-1]
+        return cls.from_toks(toks)
 
 @dataclasses.dataclass
 class Corpus:
-    token_ids: np.ndarray[np.uint64]
-    doc_indices: np.ndarray[np.uint64]
+    token_ids: np.ndarray[np.uint16|np.uint32|np.uint64]
+    doc_indices: np.ndarray[np.uint16|np.uint32|np.uint64]
     vocab: Vocab
     
+    token_ids_fname: typing.ClassVar[str] = 'token_ids.npy'
+    doc_indices_fname: typing.ClassVar[str] = 'doc_indices.npy'
+    vocab_fname: typing.ClassVar[str] = 'vocab.txt'
+    
     @classmethod
     def from_doc_tokens(cls, doc_tokens: typing.Iterable[typing.List[str]]):
         vocab = Vocab()
@@ -44,22 +106,53 @@ class Corpus:
             for tok in toks:
                 tokens.append(vocab.add_tok(tok))
         
+        # use the smallest dtypes that fit so the kernels touch less memory
         new_corpus: cls = cls(
-            token_ids = np.array(tokens, dtype=np.uint64),
-            doc_indices = np.array(doc_indices + [len(tokens)], dtype=np.uint64),
+            token_ids = np.array(tokens, dtype=smallest_uint_dtype(max(len(vocab)-1, 0))),
+            doc_indices = np.array(doc_indices + [len(tokens)], dtype=smallest_uint_dtype(len(tokens))),
             vocab = vocab
         )
         return new_corpus
     
+    ######################## Saving/Loading ########################
+    def save(self, folder: str|pathlib.Path) -> pathlib.Path:
+        '''Save corpus to folder as raw .npy arrays plus a vocab file.'''
+        folder = pathlib.Path(folder)
+        folder.mkdir(parents=True, exist_ok=True)
+        np.save(folder / self.token_ids_fname, np.ascontiguousarray(self.token_ids))
+        np.save(folder / self.doc_indices_fname, np.ascontiguousarray(self.doc_indices))
+        self.vocab.save(folder / self.vocab_fname)
+        return folder
+    
+    @classmethod
+    def load(cls, folder: str|pathlib.Path, mmap: bool = True):
+        '''Load corpus saved with save(). If mmap is True, token_ids and 
+            doc_indices are opened read-only with np.memmap, so opening is 
+            instant and processes that load the same folder share pages 
+            through the OS cache instead of each holding a copy.
+        '''
+        folder = pathlib.Path(folder)
+        mmap_mode = 'r' if mmap else None
+        new_corpus: cls = cls(
+            token_ids = np.load(folder / cls.token_ids_fname, mmap_mode=mmap_mode),
+            doc_indices = np.load(folder / cls.doc_indices_fname, mmap_mode=mmap_mode),
+            vocab = Vocab.load(folder / cls.vocab_fname),
+        )
+        return new_corpus
+    
     ######################## Useful Properties ########################
     def all_doc_tokens(self) -> typing.List[typing.List[str]]:
-        '''Get tokens as strings nested in documents.'''
-        return [self.doc_tokens(i) for i in range(self.num_docs())]
+        '''Get tokens as strings nested in documents. Decodes all tokens in 
+            one pass and then splits the flat list at document boundaries.
+        '''
+        toks = self.vocab.decode(self.token_ids)
+        inds = self.doc_indices.tolist()
+        return [toks[inds[i]:inds[i+1]] for i in range(self.num_docs())]
     
     def doc_tokens(self, ind: int) -> typing.List[str]:
-        return [self.vocab.ind_to_tok[tid] for tid in self.token_ids[self.doc_slice(ind)]]
+        return self.vocab.decode(self.doc_token_ids(ind))
     
-    def doc_token_ids(self, ind: int) -> np.ndarray[np.uint64]:
+    def doc_token_ids(self, ind: int) -> np.ndarray[np.uint16|np.uint32|np.uint64]:
         return self.token_ids[self.doc_slice(ind)]
     
     def doc_slice(self, ind: int) -> slice:
@@ -75,17 +168,87 @@ class Corpus:
         return self.doc_indices.shape[0] - 1
         
         
-def levenshtein_dist(w1: np.ndarray[np.uint64], w2: np.ndarray[np.uint64]) -> int:
-    shp = (w1.shape[0]+1,)
+######################## Distance API ########################
+Sequence = typing.Union[str, bytes, np.ndarray, typing.List[int]]
+
+def levenshtein(a: Sequence|typing.List[Sequence], b: Sequence|typing.List[Sequence]) -> int|np.ndarray[np.uint64]:
+    '''Levenshtein distance between str, bytes or integer token arrays. If 
+        a and b are lists of sequences, returns elementwise distances 
+        computed in a single kernel call.
+    '''
+    if _is_batch(a) and _is_batch(b):
+        return levenshtein_batch(a, b)
+    return levenshtein_dist(as_token_array(a), as_token_array(b))
+
+def levenshtein_dist(w1: np.ndarray[np.uint16|np.uint32|np.uint64], w2: np.ndarray[np.uint16|np.uint32|np.uint64]) -> int:
+    '''Both arrays must share a dtype to select a single kernel specialization.
+        The kernels read contiguous buffers, so strided views are copied.
+    '''
+    w1, w2 = _common_dtype(w1, w2)
+    w1, w2 = np.ascontiguousarray(w1), np.ascontiguousarray(w2)
+    shp = (min(w1.shape[0], w2.shape[0])+1,)
     return cy_levenshtein_dist(w1, w2, np.empty(shp, dtype=np.uint64))
 
-def levenshtein_dist_generic(w1: np.ndarray[np.uint64], w2: np.ndarray[np.uint64]) -> int:
-    #distances = np.empty((w1.shape[0]+1,), dtype=np.uint64)
-    return cy_levenshtein_dist_generic(w1, 0, w1.shape[0], w2, 0, w2.shape[0])
+def levenshtein_batch(seqs1: typing.List[Sequence], seqs2: typing.List[Sequence]) -> np.ndarray[np.uint64]:
+    '''Elementwise distances between two equal-length lists of sequences.'''
+    if len(seqs1) != len(seqs2):
+        raise ValueError(f'Batches must be the same length: {len(seqs1)=}, {len(seqs2)=}.')
+    
+    ds1, inds1 = as_flat_token_array(seqs1)
+    ds2, inds2 = as_flat_token_array(seqs2)
+    ds1, ds2 = _common_dtype(ds1, ds2)
+    
+    sizes = np.minimum(np.diff(inds1), np.diff(inds2))
+    distances = np.empty((int(sizes.max(initial=0))+1,), dtype=np.uint64)
+    out = np.empty((len(seqs1),), dtype=np.uint64)
+    cy_levenshtein_dist_batch(ds1, inds1, ds2, inds2, distances, out)
+    return out
+
+def as_token_array(seq: Sequence) -> np.ndarray[np.uint8|np.uint16|np.uint32|np.uint64]:
+    '''View a sequence as an unsigned array the kernels can read. bytes are 
+        viewed without copying and str is read as UCS-4 code points.
+    '''
+    if isinstance(seq, str):
+        return np.frombuffer(seq.encode('utf-32-le'), dtype=np.uint32)
+    elif isinstance(seq, (bytes, bytearray, memoryview)):
+        return np.frombuffer(seq, dtype=np.uint8)
+    
+    arr = np.asarray(seq)
+    if arr.dtype.type in UINT_DTYPES:
+        return np.ascontiguousarray(arr)
+    elif arr.dtype.kind in 'iu' or arr.size == 0:
+        if arr.size > 0 and arr.min() < 0:
+            raise ValueError('Token ids must be non-negative.')
+        return arr.astype(smallest_uint_dtype(int(arr.max(initial=0))))
+    else:
+        raise TypeError(f'Cannot compute distances over sequence of type {type(seq)} with {arr.dtype=}.')
+
+def as_flat_token_array(seqs: typing.List[Sequence]) -> typing.Tuple[np.ndarray, np.ndarray[np.uint64]]:
+    '''Concatenate sequences into one flat buffer plus offsets, using the 
+        same layout as Corpus.token_ids and Corpus.doc_indices.
+    '''
+    inds = np.zeros((len(seqs)+1,), dtype=np.uint64)
+    inds[1:] = np.cumsum([len(s) for s in seqs], dtype=np.uint64)
+    
+    if all(isinstance(s, str) for s in seqs):
+        ds = np.frombuffer(''.join(seqs).encode('utf-32-le'), dtype=np.uint32)
+    elif all(isinstance(s, bytes) for s in seqs):
+        ds = np.frombuffer(b''.join(seqs), dtype=np.uint8)
+    else:
+        arrs = [as_token_array(s) for s in seqs]
+        ds = np.concatenate(arrs) if len(arrs) > 0 else np.empty((0,), dtype=np.uint8)
+    
+    return ds, inds
+
+def _is_batch(seqs: typing.Any) -> bool:
+    '''Lists of str, bytes or arrays are batches; lists of ints are sequences.'''
+    return isinstance(seqs, list) and len(seqs) > 0 and not isinstance(seqs[0], (int, np.integer))
 
-def levenshtein_dist_corpus(w1: np.ndarray[np.uint64], w2: np.ndarray[np.uint64]) -> int:
-    #distances = np.empty((w1.shape[0]+1,), dtype=np.uint64)
-    return cy_levenshtein_dist_generic(w1, 0, w1.shape[0], w2, 0, w2.shape[0])
+def _common_dtype(w1: np.ndarray, w2: np.ndarray) -> typing.Tuple[np.ndarray, np.ndarray]:
+    if w1.dtype != w2.dtype:
+        dtype = np.promote_types(w1.dtype, w2.dtype)
+        w1, w2 = w1.astype(dtype, copy=False), w2.astype(dtype, copy=False)
+    return w1, w2
 
 if __name__ == '__main__':
     #vocab = Corpus()
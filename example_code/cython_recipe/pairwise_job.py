@@ -0,0 +1,214 @@
+from __future__ import annotations
+import numpy as np
+import dataclasses
+import typing
+import pathlib
+import concurrent.futures
+import os
+import time
+import json
+import hashlib
+
+from cy_levenshtein import cy_levenshtein_dist_tile
+from main import Corpus
+
+RECORD_DTYPE = np.dtype([('i', np.uint64), ('j', np.uint64), ('dist', np.uint64)])
+NO_MAX_DIST = np.iinfo(np.uint64).max
+MANIFEST_FNAME = 'manifest.json'
+
+@dataclasses.dataclass(frozen=True)
+class Tile:
+    '''Block of the upper-triangular pair space: docs [i_start, i_stop) x [j_start, j_stop).'''
+    i_start: int
+    i_stop: int
+    j_start: int
+    j_stop: int
+
+    @property
+    def name(self) -> str:
+        return f'tile_{self.i_start}-{self.i_stop}_{self.j_start}-{self.j_stop}'
+
+    def num_pairs(self) -> int:
+        '''Number of pairs i < j in this tile.'''
+        if self.i_start == self.j_start:
+            n = self.i_stop - self.i_start
+            return n * (n - 1) // 2
+        return (self.i_stop - self.i_start) * (self.j_stop - self.j_start)
+
+@dataclasses.dataclass
+class PairwiseJob:
+    '''Computes all-pairs distances over a saved corpus, one tile per task.
+        Each finished tile is written to its own .npy file of (i, j, dist)
+        records, and those files double as the checkpoint: rerunning a
+        killed job skips tiles whose output already exists. A manifest of
+        the corpus hash, tile_size and max_dist ties the tiles to the job
+        that wrote them, so a changed job never resumes from them.
+    '''
+    corpus_folder: pathlib.Path
+    output_folder: pathlib.Path
+    tile_size: int = 1000
+    max_dist: typing.Optional[int] = None
+    num_workers: typing.Optional[int] = None
+
+    def __post_init__(self):
+        self.corpus_folder = pathlib.Path(self.corpus_folder)
+        self.output_folder = pathlib.Path(self.output_folder)
+
+    @classmethod
+    def from_corpus(cls, corpus: Corpus, corpus_folder: str|pathlib.Path, output_folder: str|pathlib.Path, **kwargs):
+        '''Save the corpus so workers can memory-map it, then build the job.'''
+        new_job: cls = cls(
+            corpus_folder = corpus.save(corpus_folder),
+            output_folder = pathlib.Path(output_folder),
+            **kwargs
+        )
+        return new_job
+
+    ######################## Running ########################
+    def run(self, verbose: bool = True, restart: bool = False) -> int:
+        '''Compute all remaining tiles and return the number of records written
+            by this run. If the output folder holds tiles from a different 
+            corpus, tile_size or max_dist, raises ValueError unless restart 
+            is True, in which case the old tiles are deleted first.
+        '''
+        self.output_folder.mkdir(parents=True, exist_ok=True)
+        self._prepare_output(restart)
+        num_docs = Corpus.load(self.corpus_folder).num_docs()
+        tiles = self.tiles(num_docs)
+        todo = [t for t in tiles if not self.tile_path(t).exists()]
+        num_tiles = len(tiles)
+        if verbose:
+            print(f'{num_tiles-len(todo)}/{num_tiles} tiles already complete.')
+
+        num_records, num_pairs, num_done = 0, 0, num_tiles - len(todo)
+        start = time.perf_counter()
+        with concurrent.futures.ProcessPoolExecutor(
+            max_workers = self.num_workers,
+            initializer = _init_worker,
+            initargs = (self.corpus_folder,),
+        ) as executor:
+            futures = [executor.submit(_run_tile, t, self.max_dist, self.tile_path(t)) for t in todo]
+            for future in concurrent.futures.as_completed(futures):
+                tile, ct = future.result()
+                num_records += ct
+                num_pairs += tile.num_pairs()
+                num_done += 1
+                if verbose:
+                    elapsed = time.perf_counter() - start
+                    print(f'{num_done}/{num_tiles} tiles, {num_pairs:,} pairs, '
+                        f'{num_pairs/elapsed:,.0f} pairs/s.')
+
+        return num_records
+
+    def tiles(self, num_docs: int) -> typing.List[Tile]:
+        '''Tiles covering the upper triangle, row-major.'''
+        starts = range(0, num_docs, self.tile_size)
+        return [
+            Tile(i, min(i+self.tile_size, num_docs), j, min(j+self.tile_size, num_docs))
+            for i in starts for j in starts if j >= i
+        ]
+
+    def tile_path(self, tile: Tile) -> pathlib.Path:
+        return self.output_folder / f'{tile.name}.npy'
+
+    ######################## Manifest ########################
+    def manifest(self) -> typing.Dict[str, typing.Any]:
+        '''Everything the tile files depend on.'''
+        return {
+            'corpus_hash': self.corpus_hash(),
+            'tile_size': int(self.tile_size),
+            'max_dist': None if self.max_dist is None else int(self.max_dist),
+        }
+
+    def corpus_hash(self) -> str:
+        h = hashlib.sha256()
+        for fname in (Corpus.token_ids_fname, Corpus.doc_indices_fname, Corpus.vocab_fname):
+            with (self.corpus_folder / fname).open('rb') as f:
+                for block in iter(lambda: f.read(1 << 20), b''):
+                    h.update(block)
+        return h.hexdigest()
+
+    def manifest_path(self) -> pathlib.Path:
+        return self.output_folder / MANIFEST_FNAME
+
+    def read_manifest(self) -> typing.Optional[typing.Dict[str, typing.Any]]:
+        if not self.manifest_path().exists():
+            return None
+        with self.manifest_path().open('r') as f:
+            return json.load(f)
+
+    def _prepare_output(self, restart: bool) -> None:
+        '''Check that existing tiles belong to this job, or clear them when 
+            restarting, and write the manifest.
+        '''
+        manifest = self.manifest()
+        old_tiles = list(self.output_folder.glob('tile_*.npy')) + list(self.output_folder.glob('tile_*.tmp'))
+        if (len(old_tiles) > 0 or self.manifest_path().exists()) and self.read_manifest() != manifest:
+            if not restart:
+                raise ValueError(f'{self.output_folder} holds tiles from a different job '
+                    f'({self.read_manifest()=}, {manifest=}). Pass restart=True to discard them.')
+            for fpath in old_tiles:
+                fpath.unlink()
+
+        tmp_fpath = self.manifest_path().with_suffix('.tmp')
+        with tmp_fpath.open('w') as f:
+            json.dump(manifest, f)
+        os.replace(tmp_fpath, self.manifest_path())
+
+    ######################## Reading Results ########################
+    def iter_records(self) -> typing.Iterator[np.ndarray]:
+        '''Yield the record array of each completed tile of this job without 
+            loading them all.
+        '''
+        if self.read_manifest() != self.manifest():
+            raise ValueError(f'{self.output_folder} does not hold results for this job.')
+        num_docs = Corpus.load(self.corpus_folder).num_docs()
+        for tile in self.tiles(num_docs):
+            if self.tile_path(tile).exists():
+                yield np.load(self.tile_path(tile), mmap_mode='r')
+
+    def read_records(self) -> np.ndarray:
+        '''All completed records in one array with fields i, j, dist.'''
+        return np.concatenate([np.asarray(r) for r in self.iter_records()] or [np.empty((0,), dtype=RECORD_DTYPE)])
+
+
+######################## Worker Functions ########################
+_worker_corpus: typing.Optional[Corpus] = None
+
+def _init_worker(corpus_folder: pathlib.Path) -> None:
+    '''Each worker memory-maps the same files rather than receiving a pickled copy.'''
+    global _worker_corpus
+    _worker_corpus = Corpus.load(corpus_folder, mmap=True)
+
+def _run_tile(tile: Tile, max_dist: typing.Optional[int], fpath: pathlib.Path) -> typing.Tuple[Tile, int]:
+    '''Compute one tile and write it atomically so partial files never look complete.'''
+    n = tile.num_pairs()
+    out_i, out_j, out_dist = (np.empty((n,), dtype=np.uint64) for _ in range(3))
+    ct = cy_levenshtein_dist_tile(
+        _worker_corpus.doc_indices, _worker_corpus.token_ids,
+        tile.i_start, tile.i_stop, tile.j_start, tile.j_stop,
+        NO_MAX_DIST if max_dist is None else max_dist,
+        out_i, out_j, out_dist,
+    )
+
+    records = np.empty((ct,), dtype=RECORD_DTYPE)
+    records['i'], records['j'], records['dist'] = out_i[:ct], out_j[:ct], out_dist[:ct]
+
+    tmp_fpath = fpath.with_suffix('.tmp')
+    with tmp_fpath.open('wb') as f:
+        np.save(f, records)
+    os.replace(tmp_fpath, fpath)
+
+    return tile, ct
+
+if __name__ == '__main__':
+    doc_tokens = [
+        'hello world'.split(),
+        'hello word'.split(),
+        'hello bob'.split(),
+        'the world is on fire'.split(),
+        'the world is one big fire'.split(),
+    ]
+    job = PairwiseJob.from_corpus(Corpus.from_doc_tokens(doc_tokens), 'tmp_corpus', 'tmp_distances', tile_size=2, max_dist=3)
+    job.run()
+    print(job.read_records())
@@ -1,6 +1,10 @@
 from __future__ import annotations
+import numpy as np
 import typing
 import dataclasses
+import concurrent.futures
+import functools
+import pathlib
 
 class BaseResult:
     def summary_stats(self) -> typing.Dict[str, float]:
@@ -35,7 +39,8 @@ class ComplexResultInherited(BaseResult):
         }
             
     def variance(self) -> float:
-        u = self.mean()
+        # the offset shifts every number equally, so it doesn't change the spread
+        u = super().mean()
         return sum([(r - u)**2 for r in self.numbers])/len(self.numbers)
     
     def mean(self) -> float:
@@ -47,21 +52,183 @@ class ComplexResultInherited(BaseResult):
     
     
 @dataclasses.dataclass
+class SummaryStats:
+    count: int
+    mean: float
+    variance: float
+    median: float
+    
+    def with_offset(self, offset: float) -> SummaryStats:
+        '''Stats of the numbers shifted by offset: mean and median move, 
+            variance does not.
+        '''
+        return dataclasses.replace(self, mean=self.mean+offset, median=self.median+offset)
+
 class NumberContainer:
-    numbers: typing.List[float]
+    '''Numbers stored in a numpy array. Mean, variance and median are 
+        computed together and cached until numbers are added or replaced.
+    '''
+    def __init__(self, numbers: typing.Iterable[float]):
+        self.numbers = numbers
+    
+    def __repr__(self) -> str:
+        return f'{self.__class__.__name__}(numbers={self.numbers!r})'
     
     def __len__(self) -> int:
-        return len(self.numbers)
+        return self._n
+    
+    @property
+    def numbers(self) -> np.ndarray[np.float64]:
+        '''Read-only view of the stored numbers. Assign, append or extend to 
+            change them, so the cached stats are reset.
+        '''
+        view = self._buffer[:self._n]
+        view.flags.writeable = False
+        return view
+    
+    @numbers.setter
+    def numbers(self, numbers: typing.Iterable[float]) -> None:
+        if not isinstance(numbers, typing.Sized):
+            numbers = list(numbers)
+        self._buffer = np.array(numbers, dtype=np.float64).ravel()
+        self._n = len(self._buffer)
+        self._stats: typing.Optional[SummaryStats] = None
+    
+    def append(self, number: float) -> None:
+        self.extend([number])
+    
+    def extend(self, numbers: typing.Iterable[float]) -> None:
+        '''Add numbers, growing the buffer geometrically so repeated 
+            appends stay amortized O(1).
+        '''
+        if isinstance(numbers, typing.Sized):
+            new = np.asarray(numbers, dtype=np.float64)
+        else:
+            new = np.fromiter(numbers, dtype=np.float64)
+        n = self._n
+        if n + len(new) > len(self._buffer):
+            buffer = np.empty(max(2*len(self._buffer), n + len(new)), dtype=np.float64)
+            buffer[:n] = self.numbers
+            self._buffer = buffer
+        self._buffer[n:n+len(new)] = new
+        self._n = n + len(new)
+        self._stats = None
+    
+    def stats(self) -> SummaryStats:
+        '''Mean and variance from vectorized passes (variance from centered 
+            values, for stability) and the median by O(n) selection rather 
+            than a full sort.
+        '''
+        if self._stats is None:
+            n = len(self.numbers)
+            if n == 0:
+                raise ValueError('Cannot compute statistics of an empty NumberContainer.')
+            mean = self.numbers.sum() / n
+            centered = self.numbers - mean
+            self._stats = SummaryStats(
+                count = n,
+                mean = float(mean),
+                variance = float(np.dot(centered, centered) / n),
+                median = float(np.partition(self.numbers, n//2)[n//2]),
+            )
+        return self._stats
     
     def mean(self, offset: float) -> float:
-        return sum(self.numbers)/len(self.numbers) + offset
+        return self.stats().with_offset(offset).mean
     
     def variance(self, offset: float) -> float:
-        u = self.mean(offset=offset)
-        return sum([(r - u)**2 for r in self.numbers])/len(self.numbers)
+        return self.stats().with_offset(offset).variance
 
     def median(self, offset: float) -> float:
-        return sorted(self.numbers)[len(self.numbers)//2] + offset
+        return self.stats().with_offset(offset).median
+
+@dataclasses.dataclass
+class PartialStats:
+    '''Mergeable statistics for one partition. Count, mean and m2 (sum of 
+        squared deviations) merge exactly. The median comes from a weighted 
+        sample of at most max_points quantile points, which is merged by 
+        re-compressing the combined points, so it is approximate.
+    '''
+    count: int
+    mean: float
+    m2: float
+    points: np.ndarray[np.float64]
+    weights: np.ndarray[np.float64]
+    max_points: int = 1001
+
+    @classmethod
+    def from_numbers(cls, numbers: np.ndarray[np.float64], max_points: int = 1001) -> PartialStats:
+        n = len(numbers)
+        if n == 0:
+            return cls(0, 0.0, 0.0, np.empty(0), np.empty(0), max_points)
+        mean = numbers.sum() / n
+        centered = numbers - mean
+        if n <= max_points:
+            points, weights = np.sort(numbers), np.ones(n)
+        else:
+            points, weights = np.quantile(numbers, np.linspace(0, 1, max_points)), np.full(max_points, n / max_points)
+        return cls(n, float(mean), float(np.dot(centered, centered)), points, weights, max_points)
+
+    def merge(self, other: PartialStats) -> PartialStats:
+        if other.count == 0:
+            return self
+        if self.count == 0:
+            return other
+        n = self.count + other.count
+        delta = other.mean - self.mean
+        points = np.concatenate([self.points, other.points])
+        order = np.argsort(points, kind='stable')
+        points, weights = points[order], np.concatenate([self.weights, other.weights])[order]
+        if len(points) > self.max_points:
+            # keep the points at evenly spaced cumulative weights
+            cum = np.cumsum(weights)
+            keep = np.searchsorted(cum, np.linspace(cum[0], cum[-1], self.max_points))
+            points, weights = points[keep], np.full(self.max_points, cum[-1] / self.max_points)
+        return self.__class__(
+            count = n,
+            mean = self.mean + delta * other.count / n,
+            m2 = self.m2 + other.m2 + delta**2 * self.count * other.count / n,
+            points = points,
+            weights = weights,
+            max_points = self.max_points,
+        )
+
+    def summary(self) -> SummaryStats:
+        if self.count == 0:
+            raise ValueError('Cannot compute statistics of an empty partition.')
+        cum = np.cumsum(self.weights)
+        return SummaryStats(
+            count = self.count,
+            mean = self.mean,
+            variance = self.m2 / self.count,
+            median = float(self.points[np.searchsorted(cum, cum[-1] / 2, side='right')]),
+        )
+
+def load_partition(partition: str|pathlib.Path|typing.Sequence[float]) -> np.ndarray[np.float64]:
+    '''A partition is a .npy file, a text file with one number per line, or 
+        the numbers themselves.
+    '''
+    if isinstance(partition, (str, pathlib.Path)):
+        if pathlib.Path(partition).suffix == '.npy':
+            return np.load(partition).astype(np.float64, copy=False).ravel()
+        return np.loadtxt(partition, dtype=np.float64, ndmin=1)
+    return np.asarray(partition, dtype=np.float64)
+
+def partition_stats(partition: str|pathlib.Path|typing.Sequence[float], max_points: int = 1001) -> PartialStats:
+    return PartialStats.from_numbers(load_partition(partition), max_points)
+
+@dataclasses.dataclass
+class PartitionedNumberContainer:
+    '''Numbers spread across partitions (usually files). Each partition is 
+        summarized in a worker process and the partial states are merged.
+    '''
+    partitions: typing.List[str|pathlib.Path|typing.Sequence[float]]
+    max_points: int = 1001
+
+    def stats(self, max_workers: typing.Optional[int] = None) -> SummaryStats:
+        with concurrent.futures.ProcessPoolExecutor(max_workers=max_workers) as executor:
+            partials = list(executor.map(functools.partial(partition_stats, max_points=self.max_points), self.partitions))
+        return functools.reduce(PartialStats.merge, partials).summary()
 
 @dataclasses.dataclass
 class SimpleResult:
@@ -72,9 +239,10 @@ class SimpleResult:
         return cls(NumberContainer(numbers))
     
     def summary_stats(self) -> typing.Dict[str, float]:
+        stats = self.results.stats()
         return {
-            'mean': self.mean(),
-            'variance': self.variance()
+            'mean': stats.mean,
+            'variance': stats.variance,
         }
     
     def variance(self) -> float:
@@ -93,10 +261,12 @@ class ComplexResult:
         return cls(NumberContainer(numbers), offset)
     
     def summary_stats(self) -> typing.Dict[str, float]:
+        # the container's cached stats are shared by every result and offset
+        stats = self.results.stats().with_offset(self.offset)
         return {
-            'mean': self.mean(),
-            'variance': self.variance(),
-            'median': self.median(),
+            'mean': stats.mean,
+            'variance': stats.variance,
+            'median': stats.median,
         }
     
     def mean(self) -> float:
@@ -123,6 +293,13 @@ if __name__ == '__main__':
     ci = ComplexResult.from_list(mylist1, 1.0)
     print(ci.summary_stats())
     
+    # results that share a container compute the base stats once
+    numbers = NumberContainer(mylist1)
+    print([ComplexResult(numbers, offset).summary_stats() for offset in (0.0, 1.0, 2.0)])
+    
+    # partitions are summarized in parallel and merged
+    print(PartitionedNumberContainer([mylist1[:5], mylist1[5:]]).stats())
+    
     
 
 
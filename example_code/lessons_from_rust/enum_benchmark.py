@@ -3,8 +3,11 @@ import typing
 import enum
 from typing import Any
 import timeit
-import cProfile
-import pstats
+import random
+import tracemalloc
+import numpy as np
+from enum_examples import ResultArray, STATUS_OK, values_to_array
+from profiling import Profiler, ProfileTable
 
 ########################## option 1: baseline - check flag before using #########################
 @dataclasses.dataclass
@@ -97,9 +100,9 @@ def average_values_result1(objs: typing.List[ExDataType3a]):
         result = obj.access_a()
         if result.status is ResultStatus.Ok:
             values.append(result.data)
-        elif result.status is ErrorType.NOT_EVEN:
+        elif result.data is ErrorType.NOT_EVEN:
             values.append(0)
-        elif result.status is ErrorType.MISSING:
+        elif result.data is ErrorType.MISSING:
             pass
         
     return sum(values)/len(values)
@@ -179,7 +182,7 @@ class ExDataType3c:
         if self.a is None:
             return Err3(ErrorType.MISSING)
         elif self.a % 2 != 0:
-            return Err3(ErrorType.MISSING)
+            return Err3(ErrorType.NOT_EVEN)
         else:
             return Ok3(self.a)
 
@@ -238,49 +241,188 @@ def average_values_result4(objs: typing.List[ExDataType3d]):
     return sum(values)/len(values)
 
 
+########################## option 3e: slotted result with shared errors #########################
 
+@dataclasses.dataclass(slots=True)
+class Ok5:
+    data: typing.Any
+    is_ok: bool = True
 
+@dataclasses.dataclass(frozen=True, slots=True)
+class Err5:
+    error: ErrorType
+    is_ok: bool = False
 
-class Profiler:
-    def __init__(self, fname: str):
-        self.pr = cProfile.Profile()
-        self.fname = fname
-        
-    def __enter__(self):
-        self.pr.enable()
-        return self
-    
-    def __exit__(self, *args):
-        self.pr.disable()
-        r = pstats.Stats(self.pr)
-        r.sort_stats(pstats.SortKey.TIME)
-        r.dump_stats(self.fname)
+# errors carry no per-call data, so one preallocated instance per kind is enough
+ERR5_MISSING = Err5(ErrorType.MISSING)
+ERR5_NOT_EVEN = Err5(ErrorType.NOT_EVEN)
 
+@dataclasses.dataclass(slots=True)
+class ExDataType3e:
+    a: int
+    def access_a(self) -> Ok5|Err5:
+        if self.a is None:
+            return ERR5_MISSING
+        elif self.a % 2 != 0:
+            return ERR5_NOT_EVEN
+        else:
+            return Ok5(self.a)
 
-if __name__ == '__main__':
-    k = 100000
-    test_values = [None]*k*3 + list(range(k))
+def average_values_result5(objs: typing.List[ExDataType3e]):
+    values = list()
+    for obj in objs:
+        result = obj.access_a()
+        if result.is_ok:
+            values.append(result.data)
+        elif result is ERR5_NOT_EVEN:
+            values.append(0)
     
-    objs = [ExDataType1(v) for v in test_values]
-    #with Profiler(f'prof_check.prof'):
-    average_values_check(objs)
+    return sum(values)/len(values)
 
-    objs = [ExDataType2(v) for v in test_values]
-    #with Profiler(f'prof_exc.prof'):
-    average_values_exc(objs)
 
-    objs = [ExDataType3a(v) for v in test_values]
-    #with Profiler('prof_status.prof'):
-    average_values_result1(objs)
+########################## option 4: batch result arrays #########################
+
+# batch results reuse ResultArray from enum_examples: ok elements have 
+# status STATUS_OK and errors have their ErrorType value.
+
+def access_a_batch(a: np.ndarray, missing: typing.Optional[np.ndarray] = None) -> ResultArray:
+    '''ExDataType3e.access_a over a whole column of values.'''
+    a = np.asarray(a)
+    status = np.full(len(a), STATUS_OK, dtype=np.int8)
+    status[a % 2 != 0] = ErrorType.NOT_EVEN.value
+    if missing is not None:
+        status[missing] = ErrorType.MISSING.value
+    return ResultArray(status, a, ErrorType)
+
+def average_values_batch(result: ResultArray) -> float:
+    '''Same average as the per-object versions: not-even values count as 
+        zero and missing values are skipped.
+    '''
+    ok = result.is_ok()
+    num_values = np.count_nonzero(ok) + np.count_nonzero(result.is_err(ErrorType.NOT_EVEN))
+    return float(result.data[ok].sum() / num_values)
+
+
+########################## benchmark matrix #########################
+
+# name: (data type, averaging function)
+VARIANTS = {
+    'check': (ExDataType1, average_values_check),
+    'exception': (ExDataType2, average_values_exc),
+    'result': (ExDataType3a, average_values_result1),
+    'ok2/err2': (ExDataType3b, average_values_result2),
+    'ok3/err3': (ExDataType3c, average_values_result3),
+    'ok4/err4': (ExDataType3d, average_values_result4),
+    'ok5/err5 slotted shared': (ExDataType3e, average_values_result5),
+}
+
+def make_test_values(n: int, error_ratio: float, seed: int = 0) -> typing.List[typing.Optional[int]]:
+    '''n values where error_ratio of them are errors, split evenly between 
+        missing (None) and odd values. The rest are even.
+    '''
+    num_errors = int(n * error_ratio)
+    values = [None if i % 2 == 0 else 2*i+1 for i in range(num_errors)] + [2*i for i in range(n - num_errors)]
+    random.Random(seed).shuffle(values)
+    return values
 
-    objs = [ExDataType3b(v) for v in test_values]
-    #with Profiler('prof_status.prof'):
-    average_values_result2(objs)
+@dataclasses.dataclass
+class BenchmarkRow:
+    variant: str
+    error_ratio: float
+    n: int
+    ns_per_elem: float
+    retained_per_elem: float
+
+    def __str__(self) -> str:
+        return f'{self.variant:<25} {self.error_ratio:>5.2f} {self.ns_per_elem:>8.1f} ns/elem {self.retained_per_elem:>8.4f} retained/elem'
+
+def retained_blocks(fn: typing.Callable[[], typing.Any]) -> int:
+    '''Number of memory blocks allocated by fn that are still alive while 
+        its result is held. Traced with tracemalloc, so numpy buffers count 
+        as well as Python objects. Temporaries freed before fn returns (e.g. 
+        exceptions and their tracebacks) are not counted, so this is not 
+        the total number of allocations.
+    '''
+    tracemalloc.start()
+    result = fn()
+    num_blocks = sum(stat.count for stat in tracemalloc.take_snapshot().statistics('filename'))
+    tracemalloc.stop()
+    del result
+    return num_blocks
+
+def retained_per_access(DataType: type, test_values: typing.List[typing.Optional[int]]) -> float:
+    '''Blocks per element still alive after calling access_a on every 
+        object and keeping the results. Counts the Result objects (and 
+        anything they own) that survive each call. Per-call temporaries are 
+        not counted: the exception variant allocates an exception and a 
+        traceback per error, but they are freed, so it shows close to zero.
+    '''
+    objs = [DataType(v) for v in test_values]
+    if not hasattr(DataType, 'access_a'):
+        return 0.0
+    
+    def access_all() -> typing.List[typing.Any]:
+        results = [None] * len(objs)
+        for i, obj in enumerate(objs):
+            try:
+                results[i] = obj.access_a()
+            except (ValueIsMissing, ValueIsNotEven):
+                pass
+        return results
+    return retained_blocks(access_all) / len(objs)
+
+def retained_per_batch_access(a: np.ndarray, missing: np.ndarray) -> float:
+    '''Same measure for access_a_batch: the ResultArray and its status 
+        array, spread over the elements of the batch.
+    '''
+    return retained_blocks(lambda: access_a_batch(a, missing)) / len(a)
+
+def run_matrix(
+        n: int = 100_000, 
+        error_ratios: typing.Iterable[float] = (0.0, 0.1, 0.5, 0.9), 
+        repeats: int = 5,
+    ) -> typing.List[BenchmarkRow]:
+    '''Time each variant at each error ratio, best of repeats. Also checks 
+        that every variant computes the same average.
+    '''
+    rows = list()
+    for error_ratio in error_ratios:
+        test_values = make_test_values(n, error_ratio)
+        expected = None
+        for name, (DataType, average_func) in VARIANTS.items():
+            objs = [DataType(v) for v in test_values]
+            result = average_func(objs)
+            if expected is None:
+                expected = result
+            elif result != expected:
+                raise ValueError(f'Variant {name} gave {result}, expected {expected}.')
+            
+            best = min(timeit.repeat(lambda: average_func(objs), number=1, repeat=repeats))
+            rows.append(BenchmarkRow(name, error_ratio, n, best/n*1e9, retained_per_access(DataType, test_values)))
+        
+        a, missing = values_to_array(test_values)
+        result = average_values_batch(access_a_batch(a, missing))
+        if result != expected:
+            raise ValueError(f'Batch variant gave {result}, expected {expected}.')
+        best = min(timeit.repeat(lambda: average_values_batch(access_a_batch(a, missing)), number=1, repeat=repeats))
+        rows.append(BenchmarkRow('batch arrays', error_ratio, n, best/n*1e9, retained_per_batch_access(a, missing)))
+    return rows
 
-    objs = [ExDataType3c(v) for v in test_values]
-    #with Profiler('prof_status.prof'):
-    average_values_result3(objs)
 
-    objs = [ExDataType3d(v) for v in test_values]
-    #with Profiler('prof_status.prof'):
-    average_values_result4(objs)
+if __name__ == '__main__':
+    for row in run_matrix():
+        print(row)
+    
+    k = 100000
+    test_values = [None]*k*3 + list(range(k))
+    
+    # pass cprofile_fname='prof_enum.prof' to also dump a cProfile of each run
+    reports = list()
+    for name, (DataType, average_func) in VARIANTS.items():
+        with Profiler(name, track_memory=True) as prof:
+            with prof.section('build'):
+                objs = [DataType(v) for v in test_values]
+            with prof.section('average'):
+                average_func(objs)
+        reports.append(prof.report())
+    print(ProfileTable.from_reports(reports).to_text())
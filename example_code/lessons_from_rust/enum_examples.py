@@ -5,6 +5,7 @@ from typing import Any
 import timeit
 import cProfile
 import pstats
+import numpy as np
 
 
 ########################## option 3b: use result object #########################
@@ -105,6 +106,73 @@ def average_values(objs: typing.List[MyObj]) -> float:
             values.append(0)
     return sum(values)/len(values)
 
+########################## batch results over arrays #########################
+
+# status code for ok elements; errors use their enum value
+STATUS_OK = 0
+
+@dataclasses.dataclass
+class ResultArray:
+    '''Batch counterpart of Result: a status code and a data value for each 
+        element of a column instead of one Ok/Err object each.
+    '''
+    status: np.ndarray
+    data: np.ndarray
+    error_type: typing.Type[enum.Enum]
+
+    def __len__(self) -> int:
+        return len(self.status)
+
+    def __getitem__(self, i: int) -> Result:
+        status = int(self.status[i])
+        if status == STATUS_OK:
+            return Ok(self.data[i].item())
+        return Err(self.error_type(status))
+
+    def is_ok(self) -> np.ndarray:
+        return self.status == STATUS_OK
+
+    def is_err(self, error: enum.Enum) -> np.ndarray:
+        return self.status == error.value
+
+def values_to_array(values: typing.Iterable[typing.Optional[int]]) -> typing.Tuple[np.ndarray, np.ndarray]:
+    '''Integer array (None stored as 0) and a mask of the None values.'''
+    values = list(values)
+    arr = np.fromiter((0 if v is None else v for v in values), dtype=np.int64, count=len(values))
+    is_none = np.fromiter((v is None for v in values), dtype=np.bool_, count=len(values))
+    return arr, is_none
+
+@dataclasses.dataclass
+class MyObjArray:
+    '''Column of MyObj values: x as an integer array plus a mask of None.'''
+    x: np.ndarray
+    is_none: np.ndarray
+
+    @classmethod
+    def from_values(cls, values: typing.Iterable[typing.Optional[int]]):
+        new_objs: cls = cls(*values_to_array(values))
+        return new_objs
+
+    def __len__(self) -> int:
+        return len(self.x)
+
+    def __getitem__(self, i: int) -> MyObj:
+        return MyObj(None if self.is_none[i] else int(self.x[i]))
+
+    def access_x_notnone(self) -> ResultArray:
+        '''MyObj.access_x_notnone for every element at once.'''
+        status = np.full(len(self.x), STATUS_OK, dtype=np.int8)
+        status[self.x < 0] = MyErrorType.IS_NEGATIVE.value
+        status[self.is_none] = MyErrorType.IS_NONE.value
+        return ResultArray(status, self.x, MyErrorType)
+
+def average_values_array(objs: MyObjArray) -> float:
+    '''Same as average_values, using masks instead of a loop.'''
+    result = objs.access_x_notnone()
+    ok = result.is_ok()
+    num_values = np.count_nonzero(ok) + np.count_nonzero(result.is_err(MyErrorType.IS_NEGATIVE))
+    return float(result.data[ok].sum() / num_values)
+
 @dataclasses.dataclass
 class MyObjWrapper:
     obj: MyObj
@@ -133,4 +201,8 @@ if __name__ == '__main__':
     print(average_values_exception(objs))
     print(average_values(objs))
     
+    obj_array = MyObjArray.from_values(test_values)
+    print(average_values_array(obj_array))
+    print(obj_array.access_x_notnone()[0])
+    
     
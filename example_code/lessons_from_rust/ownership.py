@@ -1,5 +1,10 @@
 from __future__ import annotations
 import typing
+import random
+import numpy as np
+from profiling import Profiler, ProfileTable
+
+Values = typing.Union[typing.List[int], np.ndarray]
 
 class MyCounter:
     def __init__(self):
@@ -7,49 +12,105 @@ class MyCounter:
     
     def increment(self):
         self.count += 1
+    
+    def add(self, n: int):
+        self.count += n
         
     def combine(self, other: MyCounter):
         self.count += other.count
         
-def count_even_inplace(values: typing.List[int], ctr: MyCounter) -> None:
-    for v in values:
-        if v % 2 == 0:
-            ctr.increment()
+def count_even(values: Values) -> int:
+    '''Number of even values, vectorized for arrays.'''
+    if isinstance(values, np.ndarray):
+        return int(np.count_nonzero(values % 2 == 0))
+    return sum(1 for v in values if v % 2 == 0)
 
-def count_even_newctr(values: typing.List[int]) -> MyCounter:
+def count_even_inplace(values: Values, ctr: MyCounter) -> None:
+    ctr.add(count_even(values))
+
+def count_even_newctr(values: Values) -> MyCounter:
     ctr = MyCounter()
-    for v in values:
-        if v % 2 == 0:
-            ctr.increment()
+    ctr.add(count_even(values))
     return ctr
 
-def count_even_transfer_ownership(values: typing.List[int], ctr: MyCounter) -> MyCounter:
-    for v in values:
-        if v % 2 == 0:
-            ctr.increment()
+def count_even_transfer_ownership(values: Values, ctr: MyCounter) -> MyCounter:
+    ctr.add(count_even(values))
     return ctr
             
 def remove_zeroes_inplace(values: typing.List[int]) -> None:
-    while True:
-        try:
-            values.remove(0)
-        except ValueError:
-            break
+    '''Compact the non-zero values to the front of the same list object, 
+        then truncate from the end. Popping avoids the temporary buffer that 
+        del values[write:] allocates for the removed slice; CPython may still 
+        realloc the list's storage smaller as it shrinks.
+    '''
+    write = 0
+    for v in values:
+        if v != 0:
+            values[write] = v
+            write += 1
+    for _ in range(len(values) - write):
+        values.pop()
 
 def remove_zeroes_newlist(values: typing.List[int]) -> typing.List[int]:
     return [v for v in values if v != 0]
 
 def remove_zeroes_transfer_ownership(values: typing.List[int]) -> typing.List[int]:
-    while True:
-        try:
-            values.remove(0)
-        except ValueError:
-            break
+    remove_zeroes_inplace(values)
     return values
 
+######################## Benchmark ########################
+
+REMOVE_ZEROES = {
+    'remove_zeroes_inplace': remove_zeroes_inplace,
+    'remove_zeroes_newlist': remove_zeroes_newlist,
+    'remove_zeroes_transfer_ownership': remove_zeroes_transfer_ownership,
+}
+
+COUNT_EVEN = {
+    'count_even_inplace': lambda values: count_even_inplace(values, MyCounter()),
+    'count_even_newctr': count_even_newctr,
+    'count_even_transfer_ownership': lambda values: count_even_transfer_ownership(values, MyCounter()),
+}
 
+def make_values(n: int, zero_ratio: float = 0.5, seed: int = 0) -> typing.List[int]:
+    rng = random.Random(seed)
+    return [0 if rng.random() < zero_ratio else rng.randint(1, 1000) for _ in range(n)]
 
-import dataclasses
+def run_benchmark(
+        sizes: typing.Iterable[int] = (1_000, 10_000, 100_000, 1_000_000),
+        zero_ratio: float = 0.5,
+        repeats: int = 5,
+    ) -> typing.Tuple[ProfileTable, ProfileTable]:
+    '''Timing and memory tables with one report per input size and a 
+        section per variant. Timings run repeats times on fresh copies of the 
+        input with memory tracking off, so wall_sec is the total over repeats 
+        and is not slowed by tracemalloc. A second pass runs each variant 
+        once with tracking on to get peak_bytes.
+    '''
+    time_reports, memory_reports = list(), list()
+    for n in sizes:
+        values = make_values(n, zero_ratio)
+        arr = np.array(values)
+        with Profiler(f'n={n}') as prof:
+            _run_variants(prof, values, arr, repeats)
+        time_reports.append(prof.report())
+        with Profiler(f'n={n}', track_memory=True) as prof:
+            _run_variants(prof, values, arr, 1)
+        memory_reports.append(prof.report())
+    return ProfileTable(time_reports), ProfileTable(memory_reports)
+
+def _run_variants(prof: Profiler, values: typing.List[int], arr: np.ndarray, repeats: int) -> None:
+    for name, func in REMOVE_ZEROES.items():
+        for _ in range(repeats):
+            values_copy = list(values)
+            with prof.section(name):
+                func(values_copy)
+    for name, func in COUNT_EVEN.items():
+        for _ in range(repeats):
+            with prof.section(f'{name}[list]'):
+                func(values)
+            with prof.section(f'{name}[array]'):
+                func(arr)
 
 if __name__ == '__main__':
     mylist1 = list(range(10))
@@ -70,6 +131,11 @@ if __name__ == '__main__':
     remove_zeroes_inplace(mylist1)
     print(len(mylist1))
     
+    print(count_even(np.arange(10)))
+    time_table, memory_table = run_benchmark()
+    print(time_table.to_text(metrics=('wall_sec', 'cpu_sec')))
+    print(memory_table.to_text(metrics=('peak_bytes',)))
+    
 
 
     
\ No newline at end of file
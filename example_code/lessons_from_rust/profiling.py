@@ -0,0 +1,254 @@
+from __future__ import annotations
+
+import dataclasses
+import typing
+import contextlib
+import cProfile
+import pstats
+import json
+import time
+import tracemalloc
+
+# NOTE: a section is identified by its path of names from the outermost
+#   section, e.g. ('load', 'parse'). Times are in seconds, memory in bytes.
+
+SectionPath = typing.Tuple[str, ...]
+
+@dataclasses.dataclass
+class SectionStats:
+    path: SectionPath
+    calls: int = 0
+    wall_sec: float = 0.0
+    cpu_sec: float = 0.0
+    peak_bytes: typing.Optional[int] = None
+    top_allocations: typing.List[str] = dataclasses.field(default_factory=list)
+
+    @property
+    def name(self) -> str:
+        return self.path[-1]
+
+    def merge(self, other: SectionStats) -> SectionStats:
+        '''Combine repeated runs of the same section: times add up and the
+            peak is the largest seen.
+        '''
+        if self.path != other.path:
+            raise ValueError(f'Cannot merge different sections: {self.path=}, {other.path=}.')
+        peaks = [p for p in (self.peak_bytes, other.peak_bytes) if p is not None]
+        return self.__class__(
+            path = self.path,
+            calls = self.calls + other.calls,
+            wall_sec = self.wall_sec + other.wall_sec,
+            cpu_sec = self.cpu_sec + other.cpu_sec,
+            peak_bytes = max(peaks) if len(peaks) > 0 else None,
+            top_allocations = self.top_allocations or other.top_allocations,
+        )
+
+    def asdict(self) -> typing.Dict[str, typing.Any]:
+        return {
+            'path': list(self.path),
+            'calls': self.calls,
+            'wall_sec': self.wall_sec,
+            'cpu_sec': self.cpu_sec,
+            'peak_bytes': self.peak_bytes,
+            'top_allocations': self.top_allocations,
+        }
+
+@dataclasses.dataclass
+class _OpenSection:
+    path: SectionPath
+    wall_start: float
+    cpu_start: float
+    start_bytes: int = 0
+    peak_seen: int = 0
+    snapshot: typing.Optional[tracemalloc.Snapshot] = None
+
+def _take_snapshot() -> tracemalloc.Snapshot:
+    '''Snapshot without the allocations made by tracemalloc or this module.'''
+    return tracemalloc.take_snapshot().filter_traces([
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, __file__),
+    ])
+
+
+class Profiler:
+    '''Times nested named sections with wall and cpu clocks. With
+        track_memory, also records the peak traced memory above the start of
+        each section; with snapshots, the allocation sites that grew most.
+        If cprofile_fname is given, the whole run is also profiled with
+        cProfile and dumped there.
+
+        with Profiler('run', track_memory=True) as prof:
+            with prof.section('load'):
+                ...
+        print(prof.report().to_text())
+    '''
+    def __init__(self,
+            name: str = 'run',
+            track_memory: bool = False,
+            snapshots: bool = False,
+            top_allocations: int = 5,
+            cprofile_fname: typing.Optional[str] = None,
+        ):
+        self.name = name
+        self.track_memory = track_memory or snapshots
+        self.snapshots = snapshots
+        self.top_allocations = top_allocations
+        self.cprofile_fname = cprofile_fname
+        self.pr = cProfile.Profile() if cprofile_fname is not None else None
+        self.sections: typing.Dict[SectionPath, SectionStats] = dict()
+        self._stack: typing.List[_OpenSection] = list()
+        self._started_tracemalloc = False
+
+    def __enter__(self):
+        if self.track_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracemalloc = True
+        if self.pr is not None:
+            self.pr.enable()
+        return self
+
+    def __exit__(self, *args):
+        if self.pr is not None:
+            self.pr.disable()
+            r = pstats.Stats(self.pr)
+            r.sort_stats(pstats.SortKey.TIME)
+            r.dump_stats(self.cprofile_fname)
+        if self._started_tracemalloc:
+            tracemalloc.stop()
+            self._started_tracemalloc = False
+
+    @contextlib.contextmanager
+    def section(self, name: str) -> typing.Iterator[None]:
+        '''Time the enclosed block as a child of the currently open section.'''
+        parent = self._stack[-1] if len(self._stack) > 0 else None
+        path = (parent.path if parent is not None else tuple()) + (name,)
+        # reserve the slot so parents are listed before their children
+        self.sections.setdefault(path, SectionStats(path))
+        opened = _OpenSection(path, time.perf_counter(), time.process_time())
+        if self.track_memory:
+            current, peak = tracemalloc.get_traced_memory()
+            if parent is not None:
+                # the global peak is about to be reset, so keep the parent's
+                parent.peak_seen = max(parent.peak_seen, peak)
+            tracemalloc.reset_peak()
+            opened.start_bytes = opened.peak_seen = current
+            if self.snapshots:
+                opened.snapshot = _take_snapshot()
+
+        self._stack.append(opened)
+        try:
+            yield
+        finally:
+            self._stack.pop()
+            self._close(opened, parent)
+
+    def _close(self, opened: _OpenSection, parent: typing.Optional[_OpenSection]) -> None:
+        stats = SectionStats(
+            path = opened.path,
+            calls = 1,
+            wall_sec = time.perf_counter() - opened.wall_start,
+            cpu_sec = time.process_time() - opened.cpu_start,
+        )
+        if self.track_memory:
+            peak = max(opened.peak_seen, tracemalloc.get_traced_memory()[1])
+            stats.peak_bytes = peak - opened.start_bytes
+            if parent is not None:
+                parent.peak_seen = max(parent.peak_seen, peak)
+            if opened.snapshot is not None:
+                diff = _take_snapshot().compare_to(opened.snapshot, 'lineno')
+                stats.top_allocations = [str(d) for d in diff[:self.top_allocations]]
+
+        self.sections[opened.path] = self.sections[opened.path].merge(stats)
+
+    def report(self) -> ProfileReport:
+        return ProfileReport(self.name, dict(self.sections))
+
+
+@dataclasses.dataclass
+class ProfileReport:
+    '''Section stats from one named run.'''
+    name: str
+    sections: typing.Dict[SectionPath, SectionStats]
+
+    def merge(self, other: ProfileReport) -> ProfileReport:
+        '''Add up another run of the same code, e.g. a repeat.'''
+        sections = dict(self.sections)
+        for path, stats in other.sections.items():
+            sections[path] = sections[path].merge(stats) if path in sections else stats
+        return self.__class__(self.name, sections)
+
+    def self_wall_sec(self, path: SectionPath) -> float:
+        '''Wall time of a section minus the time of its direct children.'''
+        children = [s for p,s in self.sections.items() if len(p) == len(path)+1 and p[:len(path)] == path]
+        return self.sections[path].wall_sec - sum(c.wall_sec for c in children)
+
+    def to_text(self) -> str:
+        return ProfileTable([self]).to_text()
+
+    def to_json(self) -> str:
+        return ProfileTable([self]).to_json()
+
+    def to_collapsed(self) -> str:
+        return ProfileTable([self]).to_collapsed()
+
+
+@dataclasses.dataclass
+class ProfileTable:
+    '''Side-by-side comparison of several runs. Reports sharing a name are
+        merged into one column.
+    '''
+    reports: typing.List[ProfileReport]
+
+    @classmethod
+    def from_reports(cls, reports: typing.Iterable[ProfileReport]):
+        merged: typing.Dict[str, ProfileReport] = dict()
+        for report in reports:
+            merged[report.name] = merged[report.name].merge(report) if report.name in merged else report
+        new_table: cls = cls(list(merged.values()))
+        return new_table
+
+    def paths(self) -> typing.List[SectionPath]:
+        '''All section paths in first-seen order.'''
+        paths = dict()
+        for report in self.reports:
+            for path in report.sections:
+                paths[path] = None
+        return list(paths)
+
+    def to_text(self, metrics: typing.Sequence[str] = ('wall_sec', 'cpu_sec', 'peak_bytes')) -> str:
+        '''One row per section (indented by depth) and one column per run
+            and metric. Missing values are shown as -.
+        '''
+        header = ['section'] + [f'{r.name}:{m}' for r in self.reports for m in metrics]
+        rows = [header]
+        for path in self.paths():
+            row = ['  '*(len(path)-1) + path[-1]]
+            for report in self.reports:
+                stats = report.sections.get(path)
+                for m in metrics:
+                    value = getattr(stats, m) if stats is not None else None
+                    row.append(_format_value(value))
+            rows.append(row)
+        widths = [max(len(r[i]) for r in rows) for i in range(len(header))]
+        return '\n'.join(r[0].ljust(widths[0]) + '  ' + '  '.join(c.rjust(w) for c,w in zip(r[1:], widths[1:])) for r in rows)
+
+    def to_json(self, indent: typing.Optional[int] = 2) -> str:
+        return json.dumps({r.name:[s.asdict() for s in r.sections.values()] for r in self.reports}, indent=indent)
+
+    def to_collapsed(self) -> str:
+        '''Collapsed stacks for flamegraph tools: one "run;a;b value" line per
+            section, where value is its self wall time in microseconds.
+        '''
+        lines = list()
+        for report in self.reports:
+            for path in report.sections:
+                usec = max(0, round(report.self_wall_sec(path) * 1e6))
+                lines.append(';'.join((report.name,) + path) + f' {usec}')
+        return '\n'.join(lines)
+
+def _format_value(value: typing.Any) -> str:
+    if value is None:
+        return '-'
+    elif isinstance(value, float):
+        return f'{value:.4f}'
+    return f'{value:,}'
@@ -1,6 +1,7 @@
 from __future__ import annotations
 import numpy as np
 import pandas as pd
+import pyarrow as pa
 import dataclasses
 import typing
 
@@ -22,20 +23,379 @@ class RatioVar(Variable):
         return cls(
             v = np.array(elements, dtype=dtype),
         )
+    
+    def __len__(self) -> int:
+        return len(self.v)
+    
+    def __getitem__(self, ind: slice|np.ndarray) -> RatioVar:
+        return self.__class__(v=self.v[ind])
+    
+    @staticmethod
+    def stream(chunks: typing.Iterable[typing.Iterable[float|int]], relative_accuracy: float = 0.01) -> RatioStats:
+        '''Summarize values arriving in chunks without keeping them. Each 
+            chunk is reduced with numpy and merged into the running state.
+        '''
+        stats = RatioStats.empty(relative_accuracy)
+        for chunk in chunks:
+            stats.update(chunk)
+        return stats
+    
+    def stats(self, relative_accuracy: float = 0.01) -> RatioStats:
+        return RatioStats.empty(relative_accuracy).update(self.v)
 
-class OrdinalVar(Variable):
-    pass
+@dataclasses.dataclass
+class RatioStats:
+    '''Running summary of a ratio variable: count, mean, sum of squared 
+        deviations (m2), min and max, plus a quantile sketch. Chunks and 
+        partial states from other workers are combined with the parallel 
+        form of Welford's update (Chan et al.), which stays numerically 
+        stable without storing values.
+    '''
+    count: int
+    mean: float
+    m2: float
+    min: float
+    max: float
+    sketch: QuantileSketch
+
+    @classmethod
+    def empty(cls, relative_accuracy: float = 0.01) -> RatioStats:
+        return cls(0, 0.0, 0.0, np.inf, -np.inf, QuantileSketch.empty(relative_accuracy))
+
+    def update(self, chunk: typing.Iterable[float|int]) -> RatioStats:
+        '''Add a chunk of values in place and return self.'''
+        v = np.asarray(chunk, dtype=np.float64).ravel()
+        if len(v) > 0:
+            mean = v.mean()
+            chunk_stats = RatioStats(len(v), float(mean), float(((v - mean)**2).sum()), 
+                float(v.min()), float(v.max()), QuantileSketch.empty(self.sketch.relative_accuracy).update(v))
+            self.merge(chunk_stats)
+        return self
+
+    def merge(self, other: RatioStats) -> RatioStats:
+        '''Combine another partial state into this one in place and return self.'''
+        if other.count > 0:
+            n = self.count + other.count
+            delta = other.mean - self.mean
+            self.mean += delta * other.count / n
+            self.m2 += other.m2 + delta**2 * self.count * other.count / n
+            self.count = n
+            self.min = min(self.min, other.min)
+            self.max = max(self.max, other.max)
+            self.sketch.merge(other.sketch)
+        return self
+
+    def variance(self, ddof: int = 1) -> float:
+        return self.m2 / (self.count - ddof) if self.count > ddof else np.nan
+
+    def std(self, ddof: int = 1) -> float:
+        return np.sqrt(self.variance(ddof))
+
+    def quantile(self, q: float) -> float:
+        return self.sketch.quantile(q)
+
+@dataclasses.dataclass
+class QuantileSketch:
+    '''Mergeable quantile sketch with relative error guarantees (the 
+        logarithmic bucketing of DDSketch). A value x > 0 falls in bucket 
+        ceil(log_gamma(x)), so any reported quantile is within 
+        relative_accuracy of a true value. Negative values use mirrored 
+        buckets. Merging sketches just adds bucket counts.
+    '''
+    relative_accuracy: float
+    positive: typing.Dict[int, int]
+    negative: typing.Dict[int, int]
+    zero_count: int = 0
+
+    @classmethod
+    def empty(cls, relative_accuracy: float = 0.01) -> QuantileSketch:
+        return cls(relative_accuracy, dict(), dict())
+
+    @property
+    def gamma(self) -> float:
+        return (1 + self.relative_accuracy) / (1 - self.relative_accuracy)
+
+    def count(self) -> int:
+        return self.zero_count + sum(self.positive.values()) + sum(self.negative.values())
+
+    def update(self, v: np.ndarray[np.float64]) -> QuantileSketch:
+        v = v[~np.isnan(v)]
+        log_gamma = np.log(self.gamma)
+        self.zero_count += int(np.count_nonzero(v == 0))
+        for buckets, vals in ((self.positive, v[v > 0]), (self.negative, -v[v < 0])):
+            inds, counts = np.unique(np.ceil(np.log(vals) / log_gamma).astype(np.int64), return_counts=True)
+            for i, c in zip(inds.tolist(), counts.tolist()):
+                buckets[i] = buckets.get(i, 0) + c
+        return self
 
+    def merge(self, other: QuantileSketch) -> QuantileSketch:
+        if other.relative_accuracy != self.relative_accuracy:
+            raise ValueError(f'Cannot merge sketches with different accuracy: '
+                f'{self.relative_accuracy=}, {other.relative_accuracy=}.')
+        self.zero_count += other.zero_count
+        for buckets, other_buckets in ((self.positive, other.positive), (self.negative, other.negative)):
+            for i, c in other_buckets.items():
+                buckets[i] = buckets.get(i, 0) + c
+        return self
+
+    def quantile(self, q: float) -> float:
+        total = self.count()
+        if total == 0:
+            return np.nan
+        rank = q * (total - 1)
+        
+        # walk buckets from most negative to most positive value
+        bucket_values = [(-self._bucket_value(i), c) for i, c in sorted(self.negative.items(), reverse=True)]
+        bucket_values.append((0.0, self.zero_count))
+        bucket_values += [(self._bucket_value(i), c) for i, c in sorted(self.positive.items())]
+        
+        seen = 0
+        for value, c in bucket_values:
+            seen += c
+            if seen > rank:
+                return value
+        return bucket_values[-1][0]
+
+    def _bucket_value(self, i: int) -> float:
+        '''Representative value of bucket i, within relative_accuracy of every value in it.'''
+        return 2 * self.gamma**i / (self.gamma + 1)
+
+def smallest_code_dtype(num_categories: int) -> np.dtype:
+    '''Smallest signed integer dtype that can index num_categories.'''
+    for dtype in (np.int8, np.int16, np.int32, np.int64):
+        if num_categories <= np.iinfo(dtype).max:
+            return np.dtype(dtype)
+
+@dataclasses.dataclass(eq=False)
 class NominalVar(Variable):
-    v: np.ndarray[np.float64]
+    '''Dictionary-encoded variable: each row stores a small integer code that 
+        indexes into the categories table. Counting, crosstabs, comparisons 
+        and recoding all operate on the codes.
+    '''
+    codes: np.ndarray[np.int8|np.int16|np.int32|np.int64]
+    categories: np.ndarray
 
     @classmethod
     def from_iter(cls,
         elements: typing.Iterable[str|float|int],
-        order: typing.List[str|float|int],
-        dtype: np.float64,
-    ) -> typing.Iterable:
+        order: typing.Optional[typing.List[str|float|int]] = None,
+        dtype: typing.Optional[type] = None,
+    ) -> NominalVar:
+        '''Encode elements. If order is given it becomes the category table 
+            (and every element must appear in it); otherwise categories are 
+            the sorted unique values.
+        '''
+        values = np.asarray(list(elements), dtype=dtype)
+        if order is None:
+            categories, codes = np.unique(values, return_inverse=True)
+        else:
+            categories = np.asarray(order, dtype=dtype)
+            codes = cls._lookup_codes(categories, values)
+        
         return cls(
-            v = np.array(elements, dtype=dtype),
+            codes = codes.astype(smallest_code_dtype(len(categories))),
+            categories = categories,
+        )
+    
+    @staticmethod
+    def _lookup_codes(categories: np.ndarray, values: np.ndarray) -> np.ndarray[np.int64]:
+        '''Code of each value in an unsorted category table.'''
+        if len(categories) == 0:
+            if len(values) > 0:
+                raise ValueError(f'Values not in categories: {np.unique(values).tolist()}.')
+            return np.zeros(0, dtype=np.int64)
+        
+        sorter = np.argsort(categories, kind='stable')
+        pos = np.searchsorted(categories, values, sorter=sorter).clip(max=len(categories)-1)
+        codes = sorter[pos]
+        missing = categories[codes] != values
+        if np.any(missing):
+            raise ValueError(f'Values not in categories: {np.unique(values[missing]).tolist()}.')
+        return codes
+    
+    def __len__(self) -> int:
+        return len(self.codes)
+    
+    def __getitem__(self, ind: slice|np.ndarray) -> NominalVar:
+        '''Row selection keeps the category table.'''
+        return dataclasses.replace(self, codes=self.codes[ind])
+    
+    def values(self) -> np.ndarray:
+        '''Decode back to the original values.'''
+        return self.categories[self.codes]
+    
+    def code(self, value: str|float|int) -> int:
+        matches = np.flatnonzero(self.categories == value)
+        if len(matches) == 0:
+            raise KeyError(f'{value=} is not a category.')
+        return int(matches[0])
+    
+    ######################## Vectorized Operations ########################
+    def value_counts(self) -> typing.Dict[str|float|int, int]:
+        counts = np.bincount(self.codes, minlength=len(self.categories))
+        return dict(zip(self.categories.tolist(), counts.tolist()))
+    
+    def crosstab(self, other: NominalVar) -> pd.DataFrame:
+        '''Counts of each pair of categories, from one bincount over combined codes.'''
+        n, m = len(self.categories), len(other.categories)
+        combined = self.codes.astype(np.int64) * m + other.codes
+        counts = np.bincount(combined, minlength=n*m).reshape(n, m)
+        return pd.DataFrame(counts, index=self.categories, columns=other.categories)
+    
+    def __eq__(self, value: str|float|int) -> np.ndarray[np.bool_]:
+        if value not in self.categories:
+            return np.zeros(len(self.codes), dtype=np.bool_)
+        return self.codes == self.code(value)
+    
+    def __ne__(self, value: str|float|int) -> np.ndarray[np.bool_]:
+        return ~(self == value)
+    
+    def isin(self, values: typing.Iterable[str|float|int]) -> np.ndarray[np.bool_]:
+        '''Membership via a boolean lookup table over categories.'''
+        lut = np.isin(self.categories, list(values))
+        return lut[self.codes]
+    
+    def recode(self, mapping: typing.Dict[str|float|int, str|float|int]) -> NominalVar:
+        '''Rename or merge categories. Only the category table is touched 
+            before a single remap of the codes.
+        '''
+        new_values = [mapping.get(c, c) for c in self.categories.tolist()]
+        new_categories, remap = np.unique(np.asarray(new_values), return_inverse=True)
+        return self.__class__(
+            codes = remap[self.codes].astype(smallest_code_dtype(len(new_categories))),
+            categories = new_categories,
+        )
+
+@dataclasses.dataclass(eq=False)
+class OrdinalVar(NominalVar):
+    '''Nominal variable whose category table is ordered, so codes compare 
+        in the same order as the values they encode.
+    '''
+    @classmethod
+    def from_iter(cls,
+        elements: typing.Iterable[str|float|int],
+        order: typing.List[str|float|int],
+        dtype: typing.Optional[type] = None,
+    ) -> OrdinalVar:
+        return super().from_iter(elements, order=order, dtype=dtype)
+    
+    def __lt__(self, value: str|float|int) -> np.ndarray[np.bool_]:
+        return self.codes < self.code(value)
+    
+    def __le__(self, value: str|float|int) -> np.ndarray[np.bool_]:
+        return self.codes <= self.code(value)
+    
+    def __gt__(self, value: str|float|int) -> np.ndarray[np.bool_]:
+        return self.codes > self.code(value)
+    
+    def __ge__(self, value: str|float|int) -> np.ndarray[np.bool_]:
+        return self.codes >= self.code(value)
+    
+    def recode(self, mapping: typing.Dict[str|float|int, str|float|int]) -> OrdinalVar:
+        '''Rename or merge categories, keeping the order of first appearance.'''
+        new_values = [mapping.get(c, c) for c in self.categories.tolist()]
+        new_categories = list(dict.fromkeys(new_values))
+        remap = np.array([new_categories.index(v) for v in new_values], dtype=np.int64)
+        return self.__class__(
+            codes = remap[self.codes].astype(smallest_code_dtype(len(new_categories))),
+            categories = np.asarray(new_categories),
         )
 
+AGGREGATIONS = ('count', 'sum', 'mean', 'min', 'max')
+
+@dataclasses.dataclass
+class VarFrame:
+    '''Named Variable columns that share a row count. Slicing rows gives 
+        views of the underlying arrays; group-by works on nominal codes.
+    '''
+    columns: typing.Dict[str, Variable]
+
+    def __post_init__(self):
+        lengths = {name:len(col) for name,col in self.columns.items()}
+        if len(set(lengths.values())) > 1:
+            raise ValueError(f'All columns must have the same number of rows: {lengths}.')
+        for name, col in self.columns.items():
+            if not isinstance(col, Variable):
+                raise TypeError(f'Column {name} must be a Variable, not {type(col)}.')
+
+    @classmethod
+    def from_numpy(cls, arrays: typing.Dict[str, np.ndarray]) -> VarFrame:
+        '''Numeric arrays become RatioVar (without copying); anything else is 
+            dictionary-encoded as a NominalVar.
+        '''
+        columns = dict()
+        for name, arr in arrays.items():
+            arr = np.asarray(arr)
+            if arr.dtype.kind in 'fiu':
+                columns[name] = RatioVar(v=arr)
+            else:
+                columns[name] = NominalVar.from_iter(arr)
+        return cls(columns)
+
+    @classmethod
+    def from_arrow(cls, table: pa.Table) -> VarFrame:
+        '''Numeric columns become RatioVar and dictionary or string columns 
+            become NominalVar, reusing arrow's dictionary indices as codes.
+        '''
+        columns = dict()
+        for name in table.column_names:
+            col = table.column(name).combine_chunks()
+            if pa.types.is_floating(col.type) or pa.types.is_integer(col.type):
+                columns[name] = RatioVar(v=col.to_numpy(zero_copy_only=False))
+            else:
+                if not pa.types.is_dictionary(col.type):
+                    col = col.dictionary_encode()
+                categories = col.dictionary.to_numpy(zero_copy_only=False)
+                columns[name] = NominalVar(
+                    codes = col.indices.to_numpy(zero_copy_only=False).astype(smallest_code_dtype(len(categories))),
+                    categories = categories,
+                )
+        return cls(columns)
+
+    def __len__(self) -> int:
+        return next((len(col) for col in self.columns.values()), 0)
+
+    def __getitem__(self, key: str|slice|np.ndarray) -> Variable|VarFrame:
+        '''Column by name, or rows by slice (views), index array or boolean mask.'''
+        if isinstance(key, str):
+            return self.columns[key]
+        return self.__class__({name:col[key] for name,col in self.columns.items()})
+
+    def groupby_agg(self, by: str, aggs: typing.Dict[str, str]) -> VarFrame:
+        '''Aggregate ratio columns within groups of a nominal column, e.g. 
+            frame.groupby_agg('species', {'sepal_length': 'mean'}). Uses 
+            bincount for count/sum/mean and reduceat over a single sort 
+            for min/max, so there is no Python loop over groups or rows.
+        '''
+        group = self.columns[by]
+        if not isinstance(group, NominalVar):
+            raise TypeError(f'Can only group by a NominalVar, but {by} is {type(group)}.')
+        
+        num_groups = len(group.categories)
+        codes = group.codes.astype(np.intp)
+        counts = np.bincount(codes, minlength=num_groups)
+        order, starts = None, None
+        
+        result = {by: group.__class__(codes=np.arange(num_groups, dtype=group.codes.dtype), categories=group.categories)}
+        for name, agg in aggs.items():
+            v = self.columns[name].v
+            if agg == 'count':
+                out = counts.astype(np.float64)
+            elif agg in ('sum', 'mean'):
+                out = np.bincount(codes, weights=v, minlength=num_groups)
+                if agg == 'mean':
+                    out = np.divide(out, counts, out=np.full(num_groups, np.nan), where=counts > 0)
+            elif agg in ('min', 'max'):
+                if order is None:
+                    order = np.argsort(codes, kind='stable')
+                    starts = np.concatenate([[0], np.cumsum(counts)[:-1]])
+                ufunc = np.minimum if agg == 'min' else np.maximum
+                out = np.full(num_groups, np.nan)
+                nonempty = counts > 0
+                if np.any(nonempty):
+                    out[nonempty] = ufunc.reduceat(v[order], starts[nonempty])
+            else:
+                raise ValueError(f'Unknown aggregation {agg=}. Choose from {AGGREGATIONS}.')
+            result[name] = RatioVar(v=out)
+        
+        return self.__class__(result)
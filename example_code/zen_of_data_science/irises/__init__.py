@@ -1,3 +1,6 @@
-from .irisentry import IrisEntry
+from .irisentry import IrisEntry, ColumnValidation
 from .irisentrieslist import IrisEntriesList
 from .irisentriescontainer import IrisEntriesContainer
+from .irisentriesarray import IrisEntriesArray
+from .speciesindex import SpeciesIndex
+from . import streaming
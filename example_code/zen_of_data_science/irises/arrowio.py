@@ -0,0 +1,68 @@
+from __future__ import annotations
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pathlib
+import typing
+from .irisentry import intern_str
+
+# containers only need these columns, so wider files are read with projection
+IRIS_COLUMNS = ['sepal_length', 'sepal_width', 'species']
+
+Columns = typing.Tuple[np.ndarray, np.ndarray, np.ndarray]
+
+def table_to_columns(table: pa.Table) -> Columns:
+    '''Numpy columns from an arrow table. Float columns without nulls are
+        zero-copy views of the arrow buffers when the table has one chunk.
+    '''
+    return (
+        table.column('sepal_length').to_numpy(),
+        table.column('sepal_width').to_numpy(),
+        species_to_numpy(table.column('species')),
+    )
+
+def species_to_numpy(species: pa.ChunkedArray) -> np.ndarray[np.object_]:
+    '''Object array of species where rows of the same species share one 
+        interned string, decoded through the arrow dictionary.
+    '''
+    species = species.combine_chunks()
+    if not pa.types.is_dictionary(species.type):
+        species = species.dictionary_encode()
+    categories = np.array([intern_str(s) for s in species.dictionary.to_pylist()], dtype=np.object_)
+    return categories[species.indices.to_numpy(zero_copy_only=False)]
+
+def columns_to_table(sepal_length: np.ndarray, sepal_width: np.ndarray, species: typing.Sequence[str]) -> pa.Table:
+    '''Arrow table from numpy columns, with species dictionary-encoded.'''
+    return pa.table({
+        'sepal_length': pa.array(sepal_length, type=pa.float64()),
+        'sepal_width': pa.array(sepal_width, type=pa.float64()),
+        'species': pa.array(species, type=pa.string()).dictionary_encode(),
+    })
+
+######################## Parquet ########################
+def read_parquet(fpath: str|pathlib.Path) -> Columns:
+    return table_to_columns(pq.read_table(fpath, columns=IRIS_COLUMNS))
+
+def iter_parquet(fpath: str|pathlib.Path, batch_size: int = 65536) -> typing.Iterator[Columns]:
+    '''Stream record batches so only one batch is in memory at a time.'''
+    pfile = pq.ParquetFile(fpath)
+    for batch in pfile.iter_batches(batch_size=batch_size, columns=IRIS_COLUMNS):
+        yield table_to_columns(pa.Table.from_batches([batch]))
+
+def write_parquet(table: pa.Table, fpath: str|pathlib.Path, row_group_size: typing.Optional[int] = None) -> None:
+    pq.write_table(table, fpath, row_group_size=row_group_size)
+
+######################## Arrow IPC ########################
+def read_ipc(fpath: str|pathlib.Path) -> Columns:
+    '''Read an arrow IPC file through a memory map, so numeric columns are
+        not copied into the process.
+    '''
+    with pa.memory_map(str(fpath), 'r') as source:
+        table = pa.ipc.open_file(source).read_all().select(IRIS_COLUMNS)
+    return table_to_columns(table)
+
+def write_ipc(table: pa.Table, fpath: str|pathlib.Path) -> None:
+    with pa.OSFile(str(fpath), 'wb') as sink:
+        with pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
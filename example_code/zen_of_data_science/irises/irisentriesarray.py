@@ -0,0 +1,126 @@
+from __future__ import annotations
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pathlib
+import typing
+from .irisentry import IrisEntry, intern_str
+from . import arrowio
+from .speciesindex import SpeciesIndex
+
+class IrisEntriesArray:
+    '''Columnar alternative to IrisEntriesList: each field is stored as a
+        numpy array, and filters and derived values are vectorized. Columns
+        are treated as immutable, so the species index and groups are cached
+        for the lifetime of the object. Columns are checked with 
+        IrisEntry.validate_columns, so every row is a valid IrisEntry; 
+        validate=False skips this for columns taken from a validated array.
+    '''
+    def __init__(self, sepal_length: np.ndarray, sepal_width: np.ndarray, species: np.ndarray, validate: bool = True):
+        self.sepal_length = np.asarray(sepal_length, dtype=np.float64)
+        self.sepal_width = np.asarray(sepal_width, dtype=np.float64)
+        self.species = np.asarray(species, dtype=np.object_)
+
+        if not (len(self.sepal_length) == len(self.sepal_width) == len(self.species)):
+            raise ValueError(f'All columns must be the same length: {len(self.sepal_length)=}, '
+                f'{len(self.sepal_width)=}, {len(self.species)=}.')
+        
+        if validate:
+            # same conversion as the IrisEntry species converter
+            self.species = np.array([intern_str(s) for s in self.species], dtype=np.object_)
+            IrisEntry.validate_columns(self.sepal_length, self.sepal_width, self.species).raise_if_invalid()
+        
+        self._species_index: typing.Optional[SpeciesIndex] = None
+        self._groups: typing.Optional[typing.Dict[str, IrisEntriesArray]] = None
+
+    def __getitem__(self, ind: int|slice|np.ndarray) -> IrisEntry|IrisEntriesArray:
+        '''Integer index gives a typed IrisEntry; slices, index arrays and
+            boolean masks give a new IrisEntriesArray.
+        '''
+        if isinstance(ind, (int, np.integer)):
+            # columns were validated on construction
+            return IrisEntry._from_validated(
+                float(self.sepal_length[ind]),
+                float(self.sepal_width[ind]),
+                self.species[ind],
+            )
+        return self.__class__(self.sepal_length[ind], self.sepal_width[ind], self.species[ind], validate=False)
+
+    def __iter__(self) -> typing.Iterator[IrisEntry]:
+        return (self[i] for i in range(len(self)))
+
+    def __len__(self) -> int:
+        return len(self.sepal_length)
+
+    @classmethod
+    def from_dataframe(cls, df: pd.DataFrame):
+        new_entries: cls = cls(
+            sepal_length = df['sepal_length'].to_numpy(dtype=np.float64),
+            sepal_width = df['sepal_width'].to_numpy(dtype=np.float64),
+            species = df['species'].to_numpy(dtype=np.object_),
+        )
+        return new_entries
+
+    def as_dataframe(self) -> pd.DataFrame:
+        return pd.DataFrame({
+            'sepal_length': self.sepal_length,
+            'sepal_width': self.sepal_width,
+            'species': self.species,
+        })
+
+    ######################## Arrow/Parquet I/O ########################
+    @classmethod
+    def from_arrow(cls, table: pa.Table):
+        new_entries: cls = cls(*arrowio.table_to_columns(table))
+        return new_entries
+
+    @classmethod
+    def from_parquet(cls, fpath: str|pathlib.Path):
+        '''Read only the iris columns straight into numpy arrays.'''
+        new_entries: cls = cls(*arrowio.read_parquet(fpath))
+        return new_entries
+
+    @classmethod
+    def iter_parquet(cls, fpath: str|pathlib.Path, batch_size: int = 65536) -> typing.Iterator[IrisEntriesArray]:
+        '''Stream a parquet file as one container per record batch.'''
+        for columns in arrowio.iter_parquet(fpath, batch_size=batch_size):
+            yield cls(*columns)
+
+    @classmethod
+    def from_ipc(cls, fpath: str|pathlib.Path):
+        new_entries: cls = cls(*arrowio.read_ipc(fpath))
+        return new_entries
+
+    def to_arrow(self) -> pa.Table:
+        return arrowio.columns_to_table(self.sepal_length, self.sepal_width, self.species)
+
+    def to_parquet(self, fpath: str|pathlib.Path, row_group_size: typing.Optional[int] = None) -> None:
+        arrowio.write_parquet(self.to_arrow(), fpath, row_group_size=row_group_size)
+
+    def to_ipc(self, fpath: str|pathlib.Path) -> None:
+        arrowio.write_ipc(self.to_arrow(), fpath)
+
+    def sepal_area(self) -> np.ndarray[np.float64]:
+        return self.sepal_length * self.sepal_width
+
+    def species_index(self) -> SpeciesIndex:
+        if self._species_index is None:
+            self._species_index = SpeciesIndex(self.species)
+        return self._species_index
+
+    def group_by_species(self) -> typing.Dict[str, IrisEntriesArray]:
+        '''Columns are copied once into species order, and each group is a 
+            slice of that copy, so groups are views that share its memory.
+        '''
+        if self._groups is None:
+            index = self.species_index()
+            by_species = self[index.order]
+            self._groups = {s:by_species[index.bounds[i]:index.bounds[i+1]] for i,s in enumerate(index.categories)}
+        return dict(self._groups)
+
+    def filter_sepal_area(self, sepal_area: float, species: typing.Optional[str] = None):
+        '''Filter by sepal area, optionally only within one species group.'''
+        source = self if species is None else self.group_by_species()[species]
+        entries: self.__class__ = source[source.sepal_area() >= sepal_area]
+        return entries
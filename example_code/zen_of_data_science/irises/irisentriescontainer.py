@@ -1,38 +1,96 @@
 from __future__ import annotations
 
+import numpy as np
 import pandas as pd
+import pyarrow as pa
+import pathlib
 import typing
 from .irisentry import IrisEntry
+from . import arrowio
+from .speciesindex import SpeciesIndex
 
 class IrisEntriesContainer:
     def __init__(self, entries: typing.List[IrisEntry]):
         self.entries = entries
+    
+    @property
+    def entries(self) -> typing.Tuple[IrisEntry, ...]:
+        '''Immutable copy of the entries. Use append or reassign entries to 
+            change them, so the cached species index stays valid.
+        '''
+        return tuple(self._entries)
+    
+    @entries.setter
+    def entries(self, entries: typing.Iterable[IrisEntry]) -> None:
+        self._entries = list(entries)
+        self._species_index = None
+    
+    def append(self, entry: IrisEntry) -> None:
+        self._entries.append(entry)
+        self._species_index = None
         
     def __getitem__(self, ind: int) -> IrisEntry:
-        return self.entries[ind]
+        return self._entries[ind]
     
     def __iter__(self) -> typing.Iterator[IrisEntry]:
-        return iter(self.entries)
+        return iter(self._entries)
     
     def __len__(self) -> int:
-        return len(self.entries)
+        return len(self._entries)
     
     @classmethod
     def from_dataframe(cls, df: pd.DataFrame):
         # add type hint by hinting at returned variable
-        new_entries: cls = cls([IrisEntry.from_dataframe_row(row) for ind,row in df.iterrows()])
+        new_entries: cls = cls(IrisEntry.from_dataframe(df))
         return new_entries
         
+    ######################## Arrow/Parquet I/O ########################
+    @classmethod
+    def from_arrow(cls, table: pa.Table):
+        new_entries: cls = cls(IrisEntry.from_columns(*arrowio.table_to_columns(table)))
+        return new_entries
+    
+    @classmethod
+    def from_parquet(cls, fpath: str|pathlib.Path):
+        '''Read only the iris columns, without an intermediate DataFrame.'''
+        new_entries: cls = cls(IrisEntry.from_columns(*arrowio.read_parquet(fpath)))
+        return new_entries
+    
+    @classmethod
+    def from_ipc(cls, fpath: str|pathlib.Path):
+        new_entries: cls = cls(IrisEntry.from_columns(*arrowio.read_ipc(fpath)))
+        return new_entries
+    
+    def to_arrow(self) -> pa.Table:
+        return arrowio.columns_to_table(
+            sepal_length = np.fromiter((e.sepal_length for e in self._entries), dtype=np.float64, count=len(self._entries)),
+            sepal_width = np.fromiter((e.sepal_width for e in self._entries), dtype=np.float64, count=len(self._entries)),
+            species = [e.species for e in self._entries],
+        )
+    
+    def to_parquet(self, fpath: str|pathlib.Path, row_group_size: typing.Optional[int] = None) -> None:
+        arrowio.write_parquet(self.to_arrow(), fpath, row_group_size=row_group_size)
+    
+    def to_ipc(self, fpath: str|pathlib.Path) -> None:
+        arrowio.write_ipc(self.to_arrow(), fpath)
+    
+    def species_index(self) -> SpeciesIndex:
+        '''Categorical index over species, built on first use.'''
+        if self._species_index is None:
+            self._species_index = SpeciesIndex(e.species for e in self._entries)
+        return self._species_index
+    
     def group_by_species(self) -> typing.Dict[str, IrisEntriesContainer]:
-        groups = dict()
-        for e in self.entries:
-            groups.setdefault(e.species, list())
-            groups[e.species].append(e)
-        
-        return {s:self.__class__(es) for s,es in groups.items()}
+        return {s:self.take(rows) for s,rows in self.species_index().all_group_rows().items()}
+    
+    def take(self, rows: typing.Iterable[int]):
+        entries: self.__class__ = self.__class__([self._entries[i] for i in rows])
+        return entries
 
-    def filter_sepal_area(self, sepal_area: float):
-        entries: self.__class__ = self.__class__([e for e in self.entries if e.sepal_area() >= sepal_area])
+    def filter_sepal_area(self, sepal_area: float, species: typing.Optional[str] = None):
+        '''Filter by sepal area, optionally only within one species group.'''
+        candidates = self._entries if species is None else self.take(self.species_index().group_rows(species))
+        entries: self.__class__ = self.__class__([e for e in candidates if e.sepal_area() >= sepal_area])
         return entries
     
     
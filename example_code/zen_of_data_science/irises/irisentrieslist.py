@@ -1,15 +1,42 @@
 from __future__ import annotations
 
+import numpy as np
 import pandas as pd
+import pyarrow as pa
+import pathlib
 import typing
 from .irisentry import IrisEntry
+from . import arrowio
+from .speciesindex import SpeciesIndex
+
+def _invalidates_index(method: typing.Callable) -> typing.Callable:
+    '''Wrap a list mutator so it drops the cached species index.'''
+    def wrapper(self, *args, **kwargs):
+        self._species_index = None
+        return method(self, *args, **kwargs)
+    wrapper.__name__ = method.__name__
+    return wrapper
 
 class IrisEntriesList(typing.List[IrisEntry]):
+    _species_index: typing.Optional[SpeciesIndex] = None
+    
+    append = _invalidates_index(list.append)
+    extend = _invalidates_index(list.extend)
+    insert = _invalidates_index(list.insert)
+    pop = _invalidates_index(list.pop)
+    remove = _invalidates_index(list.remove)
+    clear = _invalidates_index(list.clear)
+    sort = _invalidates_index(list.sort)
+    reverse = _invalidates_index(list.reverse)
+    __setitem__ = _invalidates_index(list.__setitem__)
+    __delitem__ = _invalidates_index(list.__delitem__)
+    __iadd__ = _invalidates_index(list.__iadd__)
+    __imul__ = _invalidates_index(list.__imul__)
     
     @classmethod
     def from_dataframe(cls, df: pd.DataFrame):
         # add type hint by hinting at returned variable
-        elist = [IrisEntry.from_dataframe_row(row) for ind,row in df.iterrows()]
+        elist = IrisEntry.from_dataframe(df)
         new_entries: cls = cls(elist)
         return new_entries
     
@@ -20,15 +47,55 @@ class IrisEntriesList(typing.List[IrisEntry]):
             'species': [e.species for e in self],
         })
     
+    ######################## Arrow/Parquet I/O ########################
+    @classmethod
+    def from_arrow(cls, table: pa.Table):
+        new_entries: cls = cls(IrisEntry.from_columns(*arrowio.table_to_columns(table)))
+        return new_entries
+    
+    @classmethod
+    def from_parquet(cls, fpath: str|pathlib.Path):
+        '''Read only the iris columns, without an intermediate DataFrame.'''
+        new_entries: cls = cls(IrisEntry.from_columns(*arrowio.read_parquet(fpath)))
+        return new_entries
+    
+    @classmethod
+    def from_ipc(cls, fpath: str|pathlib.Path):
+        new_entries: cls = cls(IrisEntry.from_columns(*arrowio.read_ipc(fpath)))
+        return new_entries
+    
+    def to_arrow(self) -> pa.Table:
+        return arrowio.columns_to_table(
+            sepal_length = np.fromiter((e.sepal_length for e in self), dtype=np.float64, count=len(self)),
+            sepal_width = np.fromiter((e.sepal_width for e in self), dtype=np.float64, count=len(self)),
+            species = [e.species for e in self],
+        )
+    
+    def to_parquet(self, fpath: str|pathlib.Path, row_group_size: typing.Optional[int] = None) -> None:
+        arrowio.write_parquet(self.to_arrow(), fpath, row_group_size=row_group_size)
+    
+    def to_ipc(self, fpath: str|pathlib.Path) -> None:
+        arrowio.write_ipc(self.to_arrow(), fpath)
+    
+    def species_index(self) -> SpeciesIndex:
+        '''Categorical index over species, built on first use and dropped 
+            whenever the list is modified.
+        '''
+        if self._species_index is None:
+            self._species_index = SpeciesIndex(e.species for e in self)
+        return self._species_index
+    
     def group_by_species(self) -> typing.Dict[str, IrisEntriesList]:
-        groups = dict()
-        for e in self:
-            groups.setdefault(e.species, self.__class__())
-            groups[e.species].append(e)
-        return groups
+        return {s:self.take(rows) for s,rows in self.species_index().all_group_rows().items()}
+    
+    def take(self, rows: typing.Iterable[int]):
+        entries: self.__class__ = self.__class__([list.__getitem__(self, i) for i in rows])
+        return entries
 
-    def filter_sepal_area(self, sepal_area: float):
-        elist = [e for e in self if e.sepal_area() >= sepal_area]
+    def filter_sepal_area(self, sepal_area: float, species: typing.Optional[str] = None):
+        '''Filter by sepal area, optionally only within one species group.'''
+        candidates = self if species is None else self.take(self.species_index().group_rows(species))
+        elist = [e for e in candidates if e.sepal_area() >= sepal_area]
         entries: self.__class__ = self.__class__(elist)
         return entries
     
\ No newline at end of file
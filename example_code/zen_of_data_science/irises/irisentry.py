@@ -1,15 +1,24 @@
+from __future__ import annotations
 
 import attrs
 import attr
+import numpy as np
 import pandas as pd
 import typing
+import sys
+
+def intern_str(value: typing.Any) -> str:
+    '''Convert to str and intern, so rows with the same species share one object.'''
+    return sys.intern(str(value))
 
 @attr.s(frozen=True, slots=True)
 class IrisEntry:
-    '''Represents a single iris.'''
+    '''Represents a single iris. Slotted, with interned species strings so 
+        rows of the same species share one string object.
+    '''
     sepal_length: int = attrs.field(converter=float)
     sepal_width: int = attrs.field(converter=float)
-    species: str = attrs.field(converter=str) 
+    species: str = attrs.field(converter=intern_str) 
     
     @classmethod
     def from_dataframe_row(cls, row: pd.Series):
@@ -21,6 +30,71 @@ class IrisEntry:
         )
         return new_obj
     
+    @classmethod
+    def from_dataframe(cls, df: pd.DataFrame) -> typing.List[IrisEntry]:
+        '''Bulk constructor that reads each column once instead of building 
+            a pd.Series per row.
+        '''
+        return cls.from_columns(
+            sepal_length = df['sepal_length'].to_numpy(),
+            sepal_width = df['sepal_width'].to_numpy(),
+            species = df['species'].to_numpy(),
+        )
+    
+    @classmethod
+    def from_columns(cls, 
+        sepal_length: typing.Iterable[float], 
+        sepal_width: typing.Iterable[float], 
+        species: typing.Iterable[str],
+        drop_invalid: bool = False,
+    ) -> typing.List[IrisEntry]:
+        '''Bulk constructor from columns. Conversion and validation run once 
+            per column, then entries are built through _from_validated so the 
+            per-instance converters and validators don't run again. Invalid 
+            rows raise a ValueError listing every failure, or are skipped if 
+            drop_invalid is True.
+        '''
+        sepal_length = np.asarray(sepal_length, dtype=np.float64)
+        sepal_width = np.asarray(sepal_width, dtype=np.float64)
+        species = np.array([intern_str(s) for s in species], dtype=np.object_)
+        
+        validation = cls.validate_columns(sepal_length, sepal_width, species)
+        if drop_invalid:
+            keep = ~validation.invalid_mask()
+            sepal_length, sepal_width, species = sepal_length[keep], sepal_width[keep], species[keep]
+        else:
+            validation.raise_if_invalid()
+        
+        return [cls._from_validated(sl, sw, s) for sl, sw, s in zip(sepal_length.tolist(), sepal_width.tolist(), species.tolist())]
+    
+    @classmethod
+    def _from_validated(cls, sepal_length: float, sepal_width: float, species: str) -> IrisEntry:
+        '''Entry from values that were already converted and validated. Sets 
+            the slots directly instead of toggling attr.validators.disabled(), 
+            which is process-global and would also skip validation for 
+            entries built concurrently in other threads.
+        '''
+        new_obj = cls.__new__(cls)
+        object.__setattr__(new_obj, 'sepal_length', sepal_length)
+        object.__setattr__(new_obj, 'sepal_width', sepal_width)
+        object.__setattr__(new_obj, 'species', species)
+        return new_obj
+    
+    @staticmethod
+    def validate_columns(sepal_length: np.ndarray, sepal_width: np.ndarray, species: np.ndarray) -> ColumnValidation:
+        '''Vectorized equivalent of the per-instance validators. Checks every 
+            row and reports all failures instead of stopping at the first.
+        '''
+        lens = np.fromiter(map(len, species), dtype=np.int64, count=len(species))
+        return ColumnValidation(
+            num_rows = len(species),
+            failures = {
+                'sepal_length': np.flatnonzero(~(sepal_length > 0)),
+                'sepal_width': np.flatnonzero(~(sepal_width > 0)),
+                'species': np.flatnonzero(lens == 0),
+            },
+        )
+    
     @species.validator
     def species_validator(self, attr, value) -> None:
         if not len(value) > 0:
@@ -37,3 +111,26 @@ class IrisEntry:
     def sepal_area(self) -> float:
         return self.sepal_length * self.sepal_width
 
+
+
+@attr.s(frozen=True, slots=True)
+class ColumnValidation:
+    '''Result of validating whole columns: failing row indices per attribute.'''
+    num_rows: int = attrs.field()
+    failures: typing.Dict[str, np.ndarray] = attrs.field()
+    
+    def is_valid(self) -> bool:
+        return all(len(rows) == 0 for rows in self.failures.values())
+    
+    def invalid_mask(self) -> np.ndarray[np.bool_]:
+        '''True for rows that failed any check.'''
+        mask = np.zeros(self.num_rows, dtype=np.bool_)
+        for rows in self.failures.values():
+            mask[rows] = True
+        return mask
+    
+    def raise_if_invalid(self) -> None:
+        if not self.is_valid():
+            msgs = [f'{name}: {len(rows)} rows (first rows: {rows[:10].tolist()})' 
+                for name, rows in self.failures.items() if len(rows) > 0]
+            raise ValueError(f'Validation failed for {"; ".join(msgs)}.')
@@ -0,0 +1,32 @@
+from __future__ import annotations
+
+import numpy as np
+import typing
+
+class SpeciesIndex:
+    '''Categorical index over a species column: one integer code per row plus
+        the row indices of each group. The group row arrays are slices of one
+        sorted permutation, so only these index arrays share memory; taking
+        rows with them copies the data.
+    '''
+    def __init__(self, species: typing.Iterable[str]):
+        self.categories, self.codes = np.unique(np.array(list(species), dtype=np.object_), return_inverse=True)
+        self.order = np.argsort(self.codes, kind='stable')
+        self.bounds = np.searchsorted(self.codes[self.order], np.arange(len(self.categories)+1))
+
+    def __len__(self) -> int:
+        return len(self.categories)
+
+    def group_rows(self, species: str) -> np.ndarray[np.int64]:
+        '''Row indices of one group, in original order.'''
+        i = self.code(species)
+        return self.order[self.bounds[i]:self.bounds[i+1]]
+
+    def all_group_rows(self) -> typing.Dict[str, np.ndarray[np.int64]]:
+        return {s:self.order[self.bounds[i]:self.bounds[i+1]] for i,s in enumerate(self.categories)}
+
+    def code(self, species: str) -> int:
+        i = np.searchsorted(self.categories, species)
+        if i >= len(self.categories) or self.categories[i] != species:
+            raise KeyError(f'No entries with {species=}.')
+        return int(i)
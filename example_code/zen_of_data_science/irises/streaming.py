@@ -0,0 +1,75 @@
+from __future__ import annotations
+
+import attrs
+import attr
+import numpy as np
+import pandas as pd
+import pathlib
+import typing
+from .irisentry import IrisEntry
+from .irisentrieslist import IrisEntriesList
+from . import arrowio
+
+######################## Chunked Readers ########################
+def iter_csv(fpath: str|pathlib.Path, chunksize: int = 65536) -> typing.Iterator[IrisEntriesList]:
+    '''Read a csv in chunks, yielding one IrisEntriesList per chunk.'''
+    for chunk in pd.read_csv(fpath, usecols=arrowio.IRIS_COLUMNS, chunksize=chunksize):
+        yield IrisEntriesList.from_dataframe(chunk)
+
+def iter_parquet(fpath: str|pathlib.Path, batch_size: int = 65536) -> typing.Iterator[IrisEntriesList]:
+    '''Read a parquet file one record batch at a time.'''
+    for columns in arrowio.iter_parquet(fpath, batch_size=batch_size):
+        yield IrisEntriesList(IrisEntry.from_columns(*columns))
+
+######################## Incremental Aggregation ########################
+@attr.s(frozen=True, slots=True)
+class SepalAreaStats:
+    '''Mergeable summary of sepal areas for one species.'''
+    count: int = attrs.field(default=0)
+    total: float = attrs.field(default=0.0)
+    min: float = attrs.field(default=float('inf'))
+    max: float = attrs.field(default=float('-inf'))
+
+    @classmethod
+    def from_entries(cls, entries: typing.Iterable[IrisEntry]):
+        areas = np.fromiter((e.sepal_area() for e in entries), dtype=np.float64)
+        if len(areas) == 0:
+            return cls()
+        return cls(count=len(areas), total=float(areas.sum()), min=float(areas.min()), max=float(areas.max()))
+
+    def merge(self, other: SepalAreaStats) -> SepalAreaStats:
+        return self.__class__(
+            count = self.count + other.count,
+            total = self.total + other.total,
+            min = min(self.min, other.min),
+            max = max(self.max, other.max),
+        )
+
+    def mean(self) -> float:
+        return self.total / self.count
+
+SpeciesStats = typing.Dict[str, SepalAreaStats]
+
+def summarize_batch(entries: IrisEntriesList, min_sepal_area: typing.Optional[float] = None) -> SpeciesStats:
+    '''Partial per-species summary for one batch, after optional filtering.'''
+    if min_sepal_area is not None:
+        entries = entries.filter_sepal_area(min_sepal_area)
+    return {s:SepalAreaStats.from_entries(es) for s,es in entries.group_by_species().items()}
+
+def merge_stats(a: SpeciesStats, b: SpeciesStats) -> SpeciesStats:
+    merged = dict(a)
+    for species, stats in b.items():
+        merged[species] = merged[species].merge(stats) if species in merged else stats
+    return merged
+
+def summarize_stream(
+        batches: typing.Iterable[IrisEntriesList],
+        min_sepal_area: typing.Optional[float] = None,
+    ) -> SpeciesStats:
+    '''Per-species sepal area summary over a stream of batches. Only one
+        batch and the running partial results are held in memory.
+    '''
+    stats: SpeciesStats = dict()
+    for batch in batches:
+        stats = merge_stats(stats, summarize_batch(batch, min_sepal_area))
+    return stats
@@ -9,7 +9,6 @@ from .ids import IrisEntryID
 @attr.s(frozen=True, slots=True)
 class IrisEntry:
     '''Represents a single piece of data in your dataset.'''
-    __slots__ = []
     
     # good idea to make custom times for IDs to make things clearer to the reader 
     # (esp when you have many types of ids that are all strings)
@@ -0,0 +1,104 @@
+
+import numpy as np
+import typing
+import collections
+import dataclasses
+import tracemalloc
+import time
+import gc
+import irises
+from main_objectexample import IrisEntryDataclass
+
+# NOTE: compares the cost per row of different ways to store iris entries.
+#   memory is what the built collection retains: the input columns are 
+#   created inside the traced region and released, so only objects the 
+#   collection keeps (including shared input arrays) are counted.
+
+IrisEntryTuple = collections.namedtuple('IrisEntryTuple', ['sepal_length', 'sepal_width', 'species'])
+
+@dataclasses.dataclass(frozen=True, slots=True)
+class IrisEntrySlotsDataclass:
+    sepal_length: float
+    sepal_width: float
+    species: str
+
+@dataclasses.dataclass
+class BenchResult:
+    name: str
+    num_rows: int
+    bytes_per_row: float
+    build_sec: float
+    area_sec: float
+
+    def __str__(self) -> str:
+        return (f'{self.name:<20} {self.bytes_per_row:>8.1f} bytes/row '
+            f'{self.build_sec*1e9/self.num_rows:>8.1f} ns/row build '
+            f'{self.area_sec*1e9/self.num_rows:>8.1f} ns/row sepal_area')
+
+def make_columns(num_rows: int, seed: int = 0) -> typing.Tuple[np.ndarray, np.ndarray, typing.List[str]]:
+    '''Random columns. Species strings are distinct objects, as they would be
+        after parsing a file, so interning makes a difference.
+    '''
+    rng = np.random.default_rng(seed)
+    species = rng.choice(['setosa', 'versicolor', 'virginica'], num_rows).tolist()
+    return (
+        rng.uniform(4, 8, num_rows),
+        rng.uniform(2, 4.5, num_rows),
+        [s.encode().decode() for s in species],
+    )
+
+def build_entries(name: str, sl: np.ndarray, sw: np.ndarray, sp: typing.List[str]) -> typing.Any:
+    if name == 'dataclass':
+        return [IrisEntryDataclass(a, b, c) for a, b, c in zip(sl.tolist(), sw.tolist(), sp)]
+    elif name == 'slots dataclass':
+        return [IrisEntrySlotsDataclass(a, b, c) for a, b, c in zip(sl.tolist(), sw.tolist(), sp)]
+    elif name == 'namedtuple':
+        return [IrisEntryTuple(a, b, c) for a, b, c in zip(sl.tolist(), sw.tolist(), sp)]
+    elif name == 'attrs (interned)':
+        return irises.IrisEntry.from_columns(sl, sw, sp)
+    elif name == 'struct of arrays':
+        return irises.IrisEntriesArray(sl, sw, sp)
+    else:
+        raise ValueError(f'Unknown entry type {name=}.')
+
+def sepal_areas(entries: typing.Any) -> typing.Any:
+    if isinstance(entries, irises.IrisEntriesArray):
+        return entries.sepal_area()
+    return [e.sepal_length * e.sepal_width for e in entries]
+
+def retained_bytes(name: str, num_rows: int) -> int:
+    '''Traced memory still held after building the collection and dropping 
+        the inputs.
+    '''
+    gc.collect()
+    tracemalloc.start()
+    start, _ = tracemalloc.get_traced_memory()
+    entries = build_entries(name, *make_columns(num_rows))
+    gc.collect()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del entries
+    return current - start
+
+def run_benchmark(name: str, num_rows: int) -> BenchResult:
+    bytes_retained = retained_bytes(name, num_rows)
+
+    # timings are taken separately, without tracemalloc's per-allocation hook
+    sl, sw, sp = make_columns(num_rows)
+    start = time.perf_counter()
+    entries = build_entries(name, sl, sw, sp)
+    build_sec = time.perf_counter() - start
+
+    start = time.perf_counter()
+    sepal_areas(entries)
+    area_sec = time.perf_counter() - start
+
+    return BenchResult(name, num_rows, bytes_retained/num_rows, build_sec, area_sec)
+
+ENTRY_TYPES = ('dataclass', 'slots dataclass', 'namedtuple', 'attrs (interned)', 'struct of arrays')
+
+if __name__ == '__main__':
+    for num_rows in (10_000, 1_000_000):
+        print(f'{num_rows:,} rows')
+        for name in ENTRY_TYPES:
+            print(run_benchmark(name, num_rows))
@@ -26,8 +26,9 @@ class IrisEntryDataclass:
         return self.sepal_length * self.sepal_width
 
 def dataframe_to_entries(df: pd.DataFrame, EntryType: type) -> typing.List:
+    # plain dict records are much cheaper to build than the pd.Series iterrows makes
     entries = list()
-    for ind, row in df.iterrows():
+    for row in df.to_dict('records'):
         new_iris = EntryType.from_dataframe_row(row)
         entries.append(new_iris)
     return entries
@@ -73,4 +74,14 @@ if __name__ == '__main__':
     
     
     print(entries.as_dataframe().head())
+    
+    # columnar version stores each field as a numpy array
+    entries_array = irises.IrisEntriesArray.from_dataframe(iris_df)
+    print(len(entries_array), entries_array[0])
+    print(len(entries_array.filter_sepal_area(20)))
+    print({s:len(entries) for s,entries in entries_array.group_by_species().items()})
+    
+    # streaming keeps only one chunk in memory at a time
+    stats = irises.streaming.summarize_stream(irises.streaming.iter_csv('https://raw.githubusercontent.com/mwaskom/seaborn-data/master/iris.csv', chunksize=50), min_sepal_area=15)
+    print({s:st.mean() for s,st in stats.items()})
         
\ No newline at end of file
@@ -4,6 +4,9 @@ import pandas as pd
 import typing
 import irises
 import dataclasses
+from stagerunner import Stage, StageRunner
+
+IRIS_URL = 'https://raw.githubusercontent.com/mwaskom/seaborn-data/master/iris.csv'
 
 @dataclasses.dataclass
 class IrisA:
@@ -30,6 +33,13 @@ class IrisB_v1(IrisB):
     @classmethod
     def from_a(cls, a: IrisA):
         return cls(sepal_area = a.sepal_length * a.sepal_width)
+    
+    @classmethod
+    def from_a_many(cls, a: pd.DataFrame) -> pd.DataFrame:
+        '''Batch version of from_a: IrisA columns in, IrisB columns out.'''
+        return pd.DataFrame({
+            'sepal_area': a['sepal_length'].to_numpy() * a['sepal_width'].to_numpy(),
+        })
 
 @dataclasses.dataclass
 class IrisB_v2(IrisB):
@@ -39,6 +49,14 @@ class IrisB_v2(IrisB):
     @classmethod
     def from_a(cls, a: IrisA):
         return cls(sepal_area = a.sepal_length * a.sepal_width, species=a.species)
+    
+    @classmethod
+    def from_a_many(cls, a: pd.DataFrame) -> pd.DataFrame:
+        '''Batch version of from_a: IrisA columns in, IrisB columns out.'''
+        return pd.DataFrame({
+            'sepal_area': a['sepal_length'].to_numpy() * a['sepal_width'].to_numpy(),
+            'species': a['species'].to_numpy(),
+        })
 
 @dataclasses.dataclass
 class Params:
@@ -64,6 +82,33 @@ def params_0x2() -> Params:
         final_fname = 'final_0x2.csv',
     )
 
+######################## Pipeline Stages ########################
+def load_iris_a(source: str) -> pd.DataFrame:
+    return pd.read_csv(source)[['sepal_length', 'sepal_width', 'species']]
+
+def transform_a_to_b(df: pd.DataFrame, IrisB: type) -> pd.DataFrame:
+    # one vectorized pass instead of an IrisA and IrisB object per row
+    return IrisB.from_a_many(df)
+
+def summarize_b(df: pd.DataFrame) -> pd.DataFrame:
+    if 'species' in df.columns:
+        return df.groupby('species', as_index=False)['sepal_area'].mean()
+    return pd.DataFrame({'sepal_area': [df['sepal_area'].mean()]})
+
+def make_stages(params: Params, source: str = IRIS_URL) -> typing.List[Stage]:
+    '''Stages for one version. Only the transform depends on params.IrisB, so 
+        switching versions reuses the cached load stage. A local source file 
+        is hashed into the load stage's key; a URL source is not, so delete 
+        the stage cache to pick up upstream changes.
+    '''
+    return [
+        Stage('load', load_iris_a, kwargs={'source': source}, 
+            input_files=[] if source.startswith(('http://', 'https://')) else [source]),
+        Stage('transform', transform_a_to_b, inputs=['load'], kwargs={'IrisB': params.IrisB}, 
+            output_fname=params.intermediate_fname, code_deps=[params.IrisB, IrisA]),
+        Stage('summarize', summarize_b, inputs=['transform'], output_fname=params.final_fname),
+    ]
+
 if __name__ == '__main__':
     params = params_0x1()
     
@@ -73,6 +118,10 @@ if __name__ == '__main__':
     
     f'result_{params.version_name}.csv'
     
+    # second run only recomputes stages whose code changed
+    for params in (params_0x1(), params_0x2()):
+        StageRunner(params.version_name, make_stages(params)).run()
+    
     
 
         
\ No newline at end of file
@@ -0,0 +1,139 @@
+from __future__ import annotations
+
+import pandas as pd
+import concurrent.futures
+import dataclasses
+import hashlib
+import inspect
+import pathlib
+import shutil
+import typing
+import os
+
+
+@dataclasses.dataclass
+class Stage:
+    '''One step of a pipeline. func receives the outputs of the input stages
+        (in order) followed by kwargs, and returns a dataframe.
+    '''
+    name: str
+    func: typing.Callable[..., pd.DataFrame]
+    inputs: typing.List[str] = dataclasses.field(default_factory=list)
+    kwargs: typing.Dict[str, typing.Any] = dataclasses.field(default_factory=dict)
+    output_fname: typing.Optional[str] = None
+
+    # other code the stage depends on (e.g. the IrisB class it applies)
+    code_deps: typing.List[typing.Any] = dataclasses.field(default_factory=list)
+
+    # local files the stage reads. Their contents are part of the cache key;
+    # other external inputs (e.g. URLs) are not tracked.
+    input_files: typing.List[str|pathlib.Path] = dataclasses.field(default_factory=list)
+
+    def code_hash(self) -> str:
+        '''Hash of the source of func and code_deps plus kwargs, so editing
+            the transform code invalidates the cached output.
+        '''
+        h = hashlib.sha256()
+        for obj in [self.func, *self.code_deps]:
+            try:
+                h.update(inspect.getsource(obj).encode())
+            except (OSError, TypeError):
+                h.update(repr(obj).encode())
+        h.update(repr(sorted(self.kwargs.items())).encode())
+        return h.hexdigest()
+
+    def input_hash(self) -> str:
+        '''Hash of the contents of input_files, so editing an input file 
+            invalidates the cached output.
+        '''
+        h = hashlib.sha256()
+        for fpath in self.input_files:
+            h.update(str(fpath).encode())
+            with open(fpath, 'rb') as f:
+                for block in iter(lambda: f.read(1 << 20), b''):
+                    h.update(block)
+        return h.hexdigest()
+
+
+@dataclasses.dataclass
+class StageRunner:
+    '''Runs stages in dependency order and caches each output on disk. A
+        stage's cache key covers its own code, the contents of its input
+        files and the keys of its inputs, so a new version only recomputes
+        stages whose code or data (or upstream code or data) changed.
+        Outputs named by the version are copied from cache. Stages with no
+        dependencies between them run in parallel.
+    '''
+    version_name: str
+    stages: typing.List[Stage]
+    cache_dir: pathlib.Path = pathlib.Path('stage_cache')
+    output_dir: pathlib.Path = pathlib.Path('.')
+    max_workers: typing.Optional[int] = None
+    verbose: bool = True
+
+    def run(self) -> typing.Dict[str, str]:
+        '''Run all stages and return the cache key of each.'''
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        keys = self.stage_keys()
+        outputs: typing.Dict[str, pd.DataFrame] = dict()
+        for level in self.levels():
+            with concurrent.futures.ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+                futures = {s.name:executor.submit(self._run_stage, s, keys, outputs) for s in level}
+            for name, future in futures.items():
+                df = future.result()
+                if df is not None:
+                    outputs[name] = df
+        return keys
+
+    def stage_keys(self) -> typing.Dict[str, str]:
+        keys = dict()
+        for level in self.levels():
+            for s in level:
+                h = hashlib.sha256(s.name.encode())
+                h.update(s.code_hash().encode())
+                h.update(s.input_hash().encode())
+                for name in s.inputs:
+                    h.update(keys[name].encode())
+                keys[s.name] = h.hexdigest()[:16]
+        return keys
+
+    def levels(self) -> typing.List[typing.List[Stage]]:
+        '''Group stages so each only depends on stages in earlier groups.'''
+        remaining = {s.name:s for s in self.stages}
+        done, levels = set(), list()
+        while len(remaining) > 0:
+            level = [s for s in remaining.values() if all(i in done for i in s.inputs)]
+            if len(level) == 0:
+                raise ValueError(f'Stages have missing or circular inputs: {list(remaining)}.')
+            levels.append(level)
+            done |= {s.name for s in level}
+            for s in level:
+                del remaining[s.name]
+        return levels
+
+    def cache_path(self, stage_name: str, key: str) -> pathlib.Path:
+        return self.cache_dir / f'{stage_name}-{key}.csv'
+
+    def _run_stage(self, stage: Stage, keys: typing.Dict[str, str], outputs: typing.Dict[str, pd.DataFrame]) -> typing.Optional[pd.DataFrame]:
+        '''Compute the stage unless it is cached. Returns the new output, or
+            None if the cached file was used.
+        '''
+        fpath = self.cache_path(stage.name, keys[stage.name])
+        df = None
+        if fpath.exists():
+            self._log(f'{stage.name}: cached ({fpath.name})')
+        else:
+            self._log(f'{stage.name}: computing')
+            inputs = [outputs[i] if i in outputs else pd.read_csv(self.cache_path(i, keys[i])) for i in stage.inputs]
+            df = stage.func(*inputs, **stage.kwargs)
+            tmp_fpath = fpath.with_suffix('.tmp')
+            df.to_csv(tmp_fpath, index=False)
+            os.replace(tmp_fpath, fpath)
+
+        if stage.output_fname is not None:
+            shutil.copyfile(fpath, self.output_dir / stage.output_fname)
+        return df
+
+    def _log(self, msg: str) -> None:
+        if self.verbose:
+            print(f'[{self.version_name}] {msg}')
@@ -1,6 +1,7 @@
 from __future__ import annotations
 import attrs
 import attr
+import numpy as np
 import typing
 
 class PersonAgeOutOfRangeError(ValueError):
@@ -36,6 +37,54 @@ class Person:
             raise PersonFirstLastNameError(f'{attr.name} requires '
                 f'first and last names.')
 
+    @classmethod
+    def from_records(cls, 
+        records: typing.List[typing.Dict[str, typing.Any]],
+    ) -> typing.Tuple[typing.List[Person], PersonBatchValidation]:
+        '''Batch constructor: validates whole columns at once, then builds 
+            the valid rows through _from_validated, skipping the per-instance 
+            converters and validators.
+        '''
+        ages = np.array([r['age'] for r in records], dtype=np.float64)
+        names = [str(r['name']) for r in records]
+        validation = PersonBatchValidation.from_columns(ages, names)
+        
+        invalid = set(validation.invalid_rows())
+        people = [cls._from_validated(a, n) for i,(a,n) in enumerate(zip(ages.tolist(), names)) if i not in invalid]
+        return people, validation
+    
+    @classmethod
+    def _from_validated(cls, age: float, full_name: str) -> Person:
+        '''Person from already converted and validated values. Unlike 
+            attr.validators.disabled(), this changes no global state, so 
+            other threads keep validating.
+        '''
+        new_person = cls.__new__(cls)
+        object.__setattr__(new_person, 'age', age)
+        object.__setattr__(new_person, 'full_name', full_name)
+        return new_person
+
+@attr.s(frozen=True, slots=True)
+class PersonBatchValidation:
+    '''Failing row indices for each error type, checked column-wise.'''
+    failures: typing.Dict[typing.Type[ValueError], typing.List[int]] = attrs.field()
+    
+    @classmethod
+    def from_columns(cls, ages: np.ndarray, names: typing.List[str]):
+        num_words = np.fromiter((len(n.split()) for n in names), dtype=np.int64, count=len(names))
+        name_lens = np.fromiter(map(len, names), dtype=np.int64, count=len(names))
+        return cls(failures = {
+            PersonAgeOutOfRangeError: np.flatnonzero((ages < 0) | (ages > 150)).tolist(),
+            PersonNameWasEmptyError: np.flatnonzero(name_lens == 0).tolist(),
+            PersonFirstLastNameError: np.flatnonzero((name_lens > 0) & (num_words <= 1)).tolist(),
+        })
+    
+    def is_valid(self) -> bool:
+        return not any(self.failures.values())
+    
+    def invalid_rows(self) -> typing.List[int]:
+        return sorted(set().union(*self.failures.values()))
+
 person_data = [
     {'age': 22, 'name': 'jose rodriguez'},
     {'age': 5, 'name': 'johnny'},
@@ -61,6 +110,10 @@ if __name__ == '__main__':
 
     print(len(people))
     print(Person(age=10, full_name='yo holla'))
+    
+    # batch mode reports every failing row instead of raising on the first
+    people, validation = Person.from_records(person_data)
+    print(len(people), validation.failures)
 
     #Person(age=None, full_name='Jose')
     #Person(age=10, full_name='Jose')